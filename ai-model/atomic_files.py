@@ -0,0 +1,84 @@
+"""Atomic file replacement and locking shared by every writer of model and data files
+
+Files are written to a temporary name next to the target and renamed over it
+with os.replace, so concurrent readers (API workers, the next training run) see
+either the old or the new file, never a partial one. file_lock() serializes
+whole read-modify-write sequences across processes.
+"""
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: only threads of one process are serialized
+    fcntl = None
+
+# Per-path thread locks and the calling thread's lock depths, for reentrancy
+_THREAD_LOCKS = {}
+_THREAD_LOCKS_LOCK = threading.Lock()
+_held = threading.local()
+
+@contextmanager
+def atomic_write(filename, suffix='.tmp'):
+    """Yield a temporary path that replaces filename when the block succeeds
+
+    The temporary file is removed if the block raises. suffix lets writers that
+    append an extension themselves (np.save, np.savez) keep it.
+    """
+    tmp_filename = f"{filename}.{os.getpid()}{suffix}"
+    try:
+        yield tmp_filename
+        os.replace(tmp_filename, filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path across processes and threads
+
+    Uses fcntl.flock on the (created if missing) lock file. Reentrant within a
+    thread, so locked functions can call each other.
+    """
+    path = os.path.abspath(path)
+    depths = getattr(_held, 'depths', None)
+    if depths is None:
+        depths = _held.depths = {}
+    if depths.get(path):
+        depths[path] += 1
+        try:
+            yield
+        finally:
+            depths[path] -= 1
+        return
+
+    with _THREAD_LOCKS_LOCK:
+        thread_lock = _THREAD_LOCKS.setdefault(path, threading.Lock())
+    with thread_lock, open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        depths[path] = 1
+        try:
+            yield
+        finally:
+            depths[path] = 0
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def write_json_atomic(data, filename):
+    with atomic_write(filename) as tmp_filename:
+        with open(tmp_filename, 'w') as f:
+            json.dump(data, f, indent=2, default=float)
+
+def write_csv_atomic(df, filename):
+    """Write a DataFrame as CSV atomically so readers never see a partial file"""
+    with atomic_write(filename) as tmp_filename:
+        df.to_csv(tmp_filename, index=False)
+
+def copy_atomic(source, target):
+    with atomic_write(target) as tmp_target:
+        shutil.copyfile(source, tmp_target)
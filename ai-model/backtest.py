@@ -0,0 +1,235 @@
+"""Rolling-origin backtests of the forecast models
+
+    python backtest.py [--csv sales_data.csv] [--series series_sales.csv]
+                       [--models "Linear Regression" "Random Forest"] [--horizon 24]
+                       [--min-train 12] [--step 1] [--served] [--output report.json]
+
+Every origin is a month from which a forecast is made with only the months before
+it, scored on the 1..horizon months that follow and exist in the history. Origins
+start after min_train months and repeat every step months, within each series.
+
+Nothing loops over (origin, month) pairs:
+- the target rows of every scored forecast are gathered into one index array
+- Linear Regression is fitted on every history prefix at once from cumulative
+  X'X / X'y sums (one batched pseudo-inverse) and predicts all pairs in one einsum
+- other models are fitted once per origin, in parallel with joblib, and each fit
+  predicts all of its horizons in a single call
+
+Errors are then reduced per horizon: MAE, MAPE (over non-zero actuals) and trend
+accuracy, the share of forecasts that move in the same direction from the last
+known month as the actual sales did.
+"""
+import argparse
+import json
+import time
+import warnings
+
+import numpy as np
+
+from features import FEATURE_COLUMNS, seasonal_factors
+warnings.filterwarnings('ignore')
+
+# Relative cutoff for singular values in the batched least-squares solve
+LSTSQ_RCOND = 1e-10
+
+def rolling_origins(starts, stops, horizon=24, min_train=12, step=1):
+    """Every scored forecast of a rolling-origin backtest as row index arrays
+
+    starts and stops delimit each series' rows. Returns (start, origin, steps,
+    target): the first row of the series, the origin row (first forecast month),
+    months ahead and the row being forecast, one entry per scored forecast.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    stops = np.asarray(stops, dtype=np.int64)
+    lengths = np.maximum(stops - starts - min_train, 0)
+    origin_counts = (lengths + step - 1) // step
+
+    series = np.repeat(np.arange(len(starts)), origin_counts)
+    first = np.cumsum(origin_counts) - origin_counts
+    origin = starts[series] + min_train + (np.arange(len(series)) - first[series]) * step
+
+    steps = np.arange(1, horizon + 1)
+    target = origin[:, None] + steps - 1
+    scored = target < stops[series][:, None]
+    return (
+        np.broadcast_to(starts[series][:, None], target.shape)[scored],
+        np.broadcast_to(origin[:, None], target.shape)[scored],
+        np.broadcast_to(steps, target.shape)[scored],
+        target[scored]
+    )
+
+def _prefix_sums(values):
+    """Cumulative sums along the first axis with a leading zero entry"""
+    sums = np.zeros((len(values) + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=sums[1:])
+    return sums
+
+def linear_prefix_fits(X, y, starts, origins):
+    """Least-squares fits on the rows [start, origin) of every pair, solved together
+
+    Matches LinearRegression: the centered problem is solved with the
+    minimum-norm pseudo-inverse and the intercept recovered from the means.
+    Returns (coef, intercept) with one row per pair.
+    """
+    sx = _prefix_sums(X)
+    sy = _prefix_sums(y)
+    sxx = _prefix_sums(np.einsum('ij,ik->ijk', X, X))
+    sxy = _prefix_sums(X * y[:, None])
+
+    count = (origins - starts).astype(np.float64)
+    mean_x = (sx[origins] - sx[starts]) / count[:, None]
+    mean_y = (sy[origins] - sy[starts]) / count
+    cxx = sxx[origins] - sxx[starts] - count[:, None, None] * np.einsum('ij,ik->ijk', mean_x, mean_x)
+    cxy = sxy[origins] - sxy[starts] - count[:, None] * mean_x * mean_y[:, None]
+
+    coef = np.einsum('ijk,ik->ij', np.linalg.pinv(cxx, rcond=LSTSQ_RCOND, hermitian=True), cxy)
+    return coef, mean_y - np.einsum('ij,ij->i', mean_x, coef)
+
+def _fit_predict(estimator, X, y, start, origin, stop):
+    """Fit a fresh copy on rows [start, origin) and predict rows [origin, stop)"""
+    from sklearn.base import clone
+    return clone(estimator).fit(X[start:origin], y[start:origin]).predict(X[origin:stop])
+
+def _is_plain_linear(estimator):
+    from sklearn.linear_model import LinearRegression
+    return type(estimator) is LinearRegression and estimator.fit_intercept and not estimator.positive
+
+def backtest(estimator, X, y, starts=None, stops=None, horizon=24, min_train=12, step=1, n_jobs=-1):
+    """Rolling-origin forecasts of estimator over one or many series
+
+    X and y hold every series' rows in time order, series after series, delimited
+    by starts and stops (default: a single series). Returns a dict of arrays with
+    one entry per scored forecast: origin, steps, target, predicted, actual and
+    last_actual (sales of the month before the origin).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if starts is None:
+        starts, stops = [0], [len(y)]
+    start, origin, steps, target = rolling_origins(starts, stops, horizon, min_train, step)
+
+    if _is_plain_linear(estimator):
+        pairs, first, pair_index = np.unique(origin, return_index=True, return_inverse=True)
+        coef, intercept = linear_prefix_fits(X, y, start[first], pairs)
+        predicted = np.einsum('ij,ij->i', X[target], coef[pair_index]) + intercept[pair_index]
+    else:
+        from joblib import Parallel, delayed
+        # Forecasts of one origin are contiguous, so each fit predicts one slice
+        pairs, first, counts = np.unique(origin, return_index=True, return_counts=True)
+        chunks = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_predict)(estimator, X, y, start[i], o, o + n)
+            for i, o, n in zip(first, pairs, counts)
+        )
+        predicted = np.concatenate(chunks) if chunks else np.empty(0)
+
+    return {
+        'origin': origin,
+        'steps': steps,
+        'target': target,
+        'predicted': predicted,
+        'actual': y[target],
+        'last_actual': y[origin - 1]
+    }
+
+def summarize(result, horizon=24):
+    """MAE, MAPE and trend accuracy per months ahead, plus an overall row"""
+    steps = result['steps']
+    predicted, actual, last_actual = result['predicted'], result['actual'], result['last_actual']
+    abs_error = np.abs(predicted - actual)
+    nonzero = actual != 0
+    same_trend = np.sign(predicted - last_actual) == np.sign(actual - last_actual)
+
+    bins = horizon + 1
+    count = np.bincount(steps, minlength=bins)
+    mape_count = np.bincount(steps[nonzero], minlength=bins)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mae = np.bincount(steps, abs_error, bins) / count
+        mape = 100 * np.bincount(steps[nonzero], abs_error[nonzero] / np.abs(actual[nonzero]), bins) / mape_count
+        trend = 100 * np.bincount(steps, same_trend, bins) / count
+
+    def row(months_ahead, n, mae_value, mape_value, trend_value):
+        return {
+            'months_ahead': months_ahead,
+            'forecasts': int(n),
+            'mae': None if np.isnan(mae_value) else float(mae_value),
+            'mape': None if np.isnan(mape_value) else float(mape_value),
+            'trend_accuracy': None if np.isnan(trend_value) else float(trend_value)
+        }
+
+    rows = [row(h, count[h], mae[h], mape[h], trend[h]) for h in range(1, bins) if count[h]]
+    overall = row(
+        'all', len(steps), abs_error.mean() if len(steps) else np.nan,
+        100 * np.mean(abs_error[nonzero] / np.abs(actual[nonzero])) if nonzero.any() else np.nan,
+        100 * same_trend.mean() if len(steps) else np.nan
+    )
+    return rows + [overall]
+
+def backtest_frame(df, estimator, feature_columns=None, horizon=24, min_train=12, step=1,
+                   served=False, n_jobs=-1):
+    """Backtest a prepared frame, one series per series_id when the column exists
+
+    With served, forecasts get the same seasonal adjustment as the API's.
+    """
+    feature_columns = feature_columns or FEATURE_COLUMNS
+    X = df[feature_columns].to_numpy(dtype=np.float64)
+    y = df['Sales'].to_numpy(dtype=np.float64)
+    starts = stops = None
+    if 'series_id' in df:
+        # load_series_frame sorts by series, so each series is one block of rows
+        _, starts, counts = np.unique(df['series_id'].to_numpy(), return_index=True, return_counts=True)
+        stops = starts + counts
+
+    result = backtest(estimator, X, y, starts, stops, horizon, min_train, step, n_jobs)
+    if served:
+        result['predicted'] = result['predicted'] * seasonal_factors(df['Month_of_Year'].to_numpy()[result['target']])
+    return result
+
+def main():
+    """Command line entry point"""
+    from forecast_model import MODEL_CANDIDATES
+    from feature_cache import load_prepared_data
+    from series_forecast import load_series_frame
+
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of the forecast models')
+    parser.add_argument('--csv', default='sales_data.csv', help='monthly sales (default: sales_data.csv)')
+    parser.add_argument('--series', help='backtest every series of a series_id,Month,Sales file instead')
+    parser.add_argument('--models', nargs='+', default=list(MODEL_CANDIDATES),
+                        help='candidate names (default: every candidate)')
+    parser.add_argument('--horizon', type=int, default=24, help='months ahead to score (default: 24)')
+    parser.add_argument('--min-train', type=int, default=12, help='months before the first origin (default: 12)')
+    parser.add_argument('--step', type=int, default=1, help='months between origins (default: 1)')
+    parser.add_argument('--served', action='store_true', help='score the seasonally adjusted API forecast')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='parallel fits (default: all cores)')
+    parser.add_argument('--output', help='write the report as JSON')
+    args = parser.parse_args()
+
+    df = load_series_frame(args.series) if args.series else load_prepared_data(args.csv)
+    series_count = df['series_id'].nunique() if args.series else 1
+    print(f"🔁 Backtesting {len(args.models)} models on {len(df)} months across {series_count} series "
+          f"(horizon {args.horizon}, min train {args.min_train}, step {args.step})")
+
+    report = {}
+    for name in args.models:
+        start = time.perf_counter()
+        result = backtest_frame(df, MODEL_CANDIDATES[name], horizon=args.horizon, min_train=args.min_train,
+                                step=args.step, served=args.served, n_jobs=args.n_jobs)
+        elapsed = time.perf_counter() - start
+        rows = summarize(result, args.horizon)
+        report[name] = {'seconds': elapsed, 'origins': int(len(np.unique(result['origin']))), 'horizons': rows}
+
+        print(f"\n📈 {name}: {len(result['steps']):,} forecasts from {report[name]['origins']:,} origins "
+              f"in {elapsed:.2f}s")
+        print(f"{'ahead':>6} {'n':>7} {'MAE':>10} {'MAPE %':>8} {'trend %':>8}")
+        for row in rows:
+            mae = f"{row['mae']:.2f}" if row['mae'] is not None else '-'
+            mape = f"{row['mape']:.1f}" if row['mape'] is not None else '-'
+            trend = f"{row['trend_accuracy']:.1f}" if row['trend_accuracy'] is not None else '-'
+            print(f"{row['months_ahead']:>6} {row['forecasts']:>7,} {mae:>10} {mape:>8} {trend:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
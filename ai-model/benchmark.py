@@ -0,0 +1,322 @@
+"""Benchmark the training and serving paths on synthetic data
+
+    python benchmark.py --scale small
+    python benchmark.py --scale medium --compare benchmarks/benchmark-small-1a2b3c4-20250101T120000.json
+
+Generates monthly sales, raw transactions and store/category series of the chosen
+scale in a temporary directory, then measures ingestion, data preparation, model
+training, forecasts and the Flask endpoints (through the test client). Each
+benchmark reports wall time and peak traced memory; request benchmarks also report
+latency percentiles and throughput. Results are saved as JSON named after the
+current commit, and --compare prints the change against an earlier run.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+from features import month_labels
+warnings.filterwarnings('ignore')
+
+# Data sizes per scale: months of history, raw transactions, series and requests per endpoint
+SCALES = {
+    'small': {'months': 24, 'transactions': 100_000, 'series': 100, 'requests': 200},
+    'medium': {'months': 120, 'transactions': 1_000_000, 'series': 1_000, 'requests': 500},
+    'large': {'months': 240, 'transactions': 5_000_000, 'series': 5_000, 'requests': 1_000}
+}
+
+CATEGORIES = ['Men', 'Women', 'Unisex', 'Accessories']
+
+# Metrics compared by --compare; lower is better for all of them
+COMPARED_METRICS = ['seconds', 'p50_ms', 'p95_ms', 'p99_ms', 'peak_mb']
+
+def _seasonal_sales(month_index, level, rng):
+    """Trend + yearly seasonality + noise around level"""
+    trend = 1 + 0.01 * (month_index - month_index[0])
+    season = 1 + 0.2 * np.sin(2 * np.pi * (month_index % 12) / 12)
+    return np.round(level * trend * season * rng.normal(1, 0.05, len(month_index)), 2)
+
+def generate_monthly(csv_file, months, first_year=2000, seed=0):
+    """Write a Month,Sales file with months of history"""
+    rng = np.random.default_rng(seed)
+    first = first_year * 12
+    sales = _seasonal_sales(first + np.arange(months), 3000, rng)
+    with open(csv_file, 'w') as f:
+        f.write('Month,Sales\n')
+        f.writelines(f"{month},{value}\n" for month, value in zip(month_labels(first + np.arange(months), '%Y-%m'), sales))
+
+def generate_series(csv_file, n_series, months, first_year=2000, seed=0):
+    """Write a long-format series_id,Month,Sales file with n_series store/category series"""
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    first = first_year * 12
+    stores = -(-n_series // len(CATEGORIES))
+    series_ids = [f"store{store}-{category}" for store in range(stores) for category in CATEGORIES][:n_series]
+    levels = rng.uniform(200, 5000, n_series)
+    month_index = first + np.arange(months)
+    trend = 1 + 0.01 * np.arange(months)
+    season = 1 + 0.2 * np.sin(2 * np.pi * (month_index % 12) / 12)
+    sales = levels[:, None] * trend * season * rng.normal(1, 0.05, (n_series, months))
+    pd.DataFrame({
+        'series_id': np.repeat(series_ids, months),
+        'Month': np.tile(month_labels(first + np.arange(months), '%Y-%m'), n_series),
+        'Sales': np.round(sales.ravel(), 2)
+    }).to_csv(csv_file, index=False)
+    return series_ids
+
+def generate_transactions(csv_file, rows, months, first_year=2000, seed=0, chunksize=1_000_000):
+    """Write a raw POS export (Date,Total,Category,Store) spread over months, in chunks"""
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    first_day = np.datetime64(f"{first_year:04d}-01-01")
+    last_day = (np.datetime64(f"{first_year:04d}-01") + np.timedelta64(months, 'M')).astype('datetime64[D]')
+    days = int((last_day - first_day).astype(int))
+    for start in range(0, rows, chunksize):
+        size = min(chunksize, rows - start)
+        pd.DataFrame({
+            'Date': first_day + rng.integers(0, days, size).astype('timedelta64[D]'),
+            'Total': np.round(rng.gamma(2.0, 60.0, size), 2),
+            'Category': rng.choice(CATEGORIES, size),
+            'Store': np.char.add('s', rng.integers(0, 20, size).astype(str))
+        }).to_csv(csv_file, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+def measure(fn, *args, setup=None, **kwargs):
+    """Run fn, returning (result, {'seconds', 'peak_mb'})
+
+    tracemalloc slows allocation-heavy code down, so fn is timed on a plain run and
+    its peak memory is taken from a second, traced run. setup() is called before
+    each run to restore the starting state.
+    """
+    if setup:
+        setup()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    seconds = time.perf_counter() - start
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {'seconds': seconds, 'peak_mb': peak / 2 ** 20}
+
+def latency(fn, requests):
+    """Call fn requests times and summarise per-call latency"""
+    times = np.empty(requests)
+    for i in range(requests):
+        start = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(times, [50, 95, 99]) * 1000
+    return {
+        'requests': requests,
+        'mean_ms': float(times.mean() * 1000),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'throughput_rps': float(requests / times.sum())
+    }
+
+def measure_latency(fn, requests, traced_requests=20):
+    """latency() plus the peak memory of a short traced run"""
+    stats = latency(fn, requests)
+    _, run = measure(latency, fn, min(requests, traced_requests))
+    stats['peak_mb'] = run['peak_mb']
+    return stats
+
+def _check_response(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.path} returned {response.status_code}")
+
+def run_benchmarks(scale, workdir, log=print):
+    """Generate data for scale in workdir and run every benchmark, returning results"""
+    from ingest import aggregate_transactions
+    from forecast_model import SalesForecastModel
+    from compact_model import load_compact
+    import forecast_api as api_module
+
+    config = SCALES[scale]
+    csv_file = os.path.join(workdir, 'sales_data.csv')
+    series_file = os.path.join(workdir, 'series_sales.csv')
+    transactions_file = os.path.join(workdir, 'transactions.csv')
+    model_file = os.path.join(workdir, 'sales_model.pkl')
+    results = {}
+
+    def record(name, metrics):
+        results[name] = metrics
+        summary = ', '.join(f"{key}={value:,.3f}" if isinstance(value, float) else f"{key}={value:,}"
+                            for key, value in metrics.items())
+        log(f"⏱️  {name}: {summary}")
+
+    log(f"🧪 Generating {scale} data in {workdir}...")
+    generate_monthly(csv_file, config['months'])
+    series_ids = generate_series(series_file, config['series'], config['months'])
+    generate_transactions(transactions_file, config['transactions'], config['months'])
+
+    def quietly(fn, *args, **kwargs):
+        """measure() with the model's progress output suppressed"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return measure(fn, *args, **kwargs)
+
+    # Training path
+    (_, _, stats), metrics = measure(aggregate_transactions, transactions_file, category_col='Category',
+                                     store_col='Store', date_format='%Y-%m-%d')
+    record('ingest_transactions', dict(metrics, rows=stats['rows'], rows_per_sec=stats['rows_per_sec']))
+
+    model = SalesForecastModel()
+    from feature_cache import cache_paths
+
+    def drop_cache():
+        for path in cache_paths(csv_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    _, metrics = quietly(model.prepare_data, csv_file, setup=drop_cache)
+    record('prepare_data_cold', metrics)
+    df, metrics = quietly(model.prepare_data, csv_file)
+    record('prepare_data_cached', metrics)
+    _, metrics = quietly(model.train_models, df)
+    record('train_models', dict(metrics, rows=len(df)))
+    series_df, metrics = quietly(model.prepare_series_data, series_file)
+    record('prepare_series_data', dict(metrics, rows=len(series_df)))
+    _, metrics = quietly(model.train_series_models, series_df)
+    record('train_series_models', dict(metrics, series=len(series_ids)))
+    _, metrics = quietly(model.save_model, model_file)
+    record('save_model', metrics)
+
+    # Serving path
+    forecast_api, metrics = quietly(api_module.ForecastAPI, csv_file, model_file)
+    record('api_startup', metrics)
+    _, metrics = measure(load_compact, os.path.splitext(model_file)[0] + '.npz')
+    record('load_compact_model', metrics)
+
+    requests = config['requests']
+
+    def uncached_sales():
+        forecast_api.cache.clear()
+        forecast_api.predict_sales(12)
+
+    def uncached_series():
+        forecast_api.cache.clear()
+        forecast_api.predict_series(series_ids, 12)
+
+    record('predict_sales_materialized', measure_latency(lambda: forecast_api.predict_sales(12), requests))
+
+    # Without the materialized table predict_sales runs the model and the forecast cache
+    materialized = forecast_api.model_data.pop('materialized_forecasts', None)
+    try:
+        record('predict_sales_uncached', measure_latency(uncached_sales, requests))
+        record('predict_sales_cached', measure_latency(lambda: forecast_api.predict_sales(12), requests))
+    finally:
+        if materialized is not None:
+            forecast_api.model_data['materialized_forecasts'] = materialized
+    record('predict_all_series_uncached', dict(
+        measure_latency(uncached_series, max(1, requests // 20)), series=len(series_ids)
+    ))
+
+    # Endpoints through Flask's test client, served by the benchmark's ForecastAPI
+    served_api = api_module.forecast_api
+    api_module.forecast_api = forecast_api
+    try:
+        client = api_module.app.test_client()
+        some_series = ','.join(series_ids[:10])
+        batch = {'queries': [{'months': 6}, {'months': 12, 'series': series_ids[:10]}, {'months': 3, 'include_categories': True}]}
+        endpoints = {
+            'GET /': lambda: client.get('/'),
+            'GET /api/forecast/sales': lambda: client.get('/api/forecast/sales?months=12'),
+            'GET /api/forecast/sales?series': lambda: client.get(f'/api/forecast/sales?months=12&series={some_series}'),
+            'GET /api/forecast/categories': lambda: client.get('/api/forecast/categories'),
+            'POST /api/forecast/batch': lambda: client.post('/api/forecast/batch', json=batch),
+            'GET /api/model/info': lambda: client.get('/api/model/info')
+        }
+        for name, call in endpoints.items():
+            _check_response(call())
+            record(name, measure_latency(call, requests))
+    finally:
+        api_module.forecast_api = served_api
+
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def save_results(results, scale, output_dir):
+    """Save a benchmark run as JSON and return its path"""
+    import sklearn
+    commit = _git_commit()
+    timestamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(),
+        'scale': scale,
+        'config': SCALES[scale],
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count()
+        },
+        'results': results
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    filename = os.path.join(output_dir, f"benchmark-{scale}-{commit}-{timestamp}.json")
+    with open(filename, 'w') as f:
+        json.dump(report, f, indent=2)
+    return filename
+
+def compare(results, previous_file, scale):
+    """Print the change of each compared metric against a previous run"""
+    with open(previous_file) as f:
+        previous = json.load(f)
+    print(f"\n📊 Compared with {previous['commit']} ({previous['scale']}, {previous['timestamp']}):")
+    if previous['config'] != SCALES[scale]:
+        print(f"⚠️  The earlier run used different data sizes than --scale {scale}")
+    for name, metrics in results.items():
+        old_metrics = previous['results'].get(name)
+        if not old_metrics:
+            continue
+        changes = []
+        for key in COMPARED_METRICS:
+            if key in metrics and old_metrics.get(key):
+                change = (metrics[key] - old_metrics[key]) / old_metrics[key] * 100
+                changes.append(f"{key} {old_metrics[key]:,.2f} → {metrics[key]:,.2f} ({change:+.0f}%)")
+        if changes:
+            print(f"   {name}: {'; '.join(changes)}")
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Benchmark training and serving on synthetic data')
+    parser.add_argument('--scale', choices=list(SCALES), default='small', help='data size (default: small)')
+    parser.add_argument('--output', default='benchmarks', help='directory for JSON results (default: benchmarks)')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='forecast-bench-') as workdir:
+        results = run_benchmarks(args.scale, workdir)
+
+    filename = save_results(results, args.scale, args.output)
+    print(f"\n✅ Results saved to {filename}")
+    if args.compare:
+        compare(results, args.compare, args.scale)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Check and time the flat-array tree evaluator against sklearn
+
+    python benchmark_trees.py [--trees 100] [--rows 24 1000 100000]
+
+Fits the Random Forest (and Gradient Boosting) candidates on sales_data.csv,
+exports them with compact_model.export_compact, checks the flat evaluator returns
+the same predictions as sklearn's predict - including rows sitting exactly on
+split thresholds - and reports the time per call for several batch sizes.
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+from sklearn.base import clone
+
+from compact_model import export_compact
+from forecast_model import MODEL_CANDIDATES
+from feature_cache import load_prepared_data
+from features import FEATURE_COLUMNS, build_month_index_features
+warnings.filterwarnings('ignore')
+
+def _best_time(fn, repeat=5):
+    """Best wall time of repeat calls, in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def _sample_rows(first_year, last_month_index, rows, rng):
+    """Forecast rows for random months around the training range"""
+    month_index = last_month_index + rng.integers(-36, 25, size=rows)
+    return build_month_index_features(month_index, first_year, FEATURE_COLUMNS)
+
+def check_equivalence(model, predictor, X, rtol=1e-9, atol=1e-6):
+    """Raise AssertionError unless predictor matches model.predict on X"""
+    expected = model.predict(X)
+    actual = predictor.predict(X)
+    if not np.allclose(actual, expected, rtol=rtol, atol=atol):
+        worst = np.abs(actual - expected).max()
+        raise AssertionError(f"Compact predictions differ from sklearn by up to {worst}")
+    return float(np.abs(actual - expected).max())
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Benchmark the flat-array tree evaluator')
+    parser.add_argument('--csv', default='sales_data.csv', help='training data (default: sales_data.csv)')
+    parser.add_argument('--trees', type=int, default=100, help='random forest size (default: 100)')
+    parser.add_argument('--rows', type=int, nargs='+', default=[24, 1000, 100000],
+                        help='batch sizes to time (default: 24 1000 100000)')
+    args = parser.parse_args()
+
+    df = load_prepared_data(args.csv)
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    y = df['Sales'].to_numpy(dtype=np.float64)
+    first_year = int(df['Year'].min())
+    last_month_index = int(df['Year'].iloc[-1]) * 12 + int(df['Month_of_Year'].iloc[-1]) - 1
+    rng = np.random.default_rng(0)
+
+    estimators = {
+        'Random Forest': clone(MODEL_CANDIDATES['Random Forest']).set_params(n_estimators=args.trees),
+        'Gradient Boosting': clone(MODEL_CANDIDATES['Gradient Boosting'])
+    }
+    for name, estimator in estimators.items():
+        model = estimator.fit(X, y)
+        predictor = export_compact(model)
+        print(f"\n🌲 {name}: {len(predictor.roots)} trees, {len(predictor.left):,} nodes, depth {predictor.depth}")
+
+        # Training rows, random horizons and rows placed exactly on split thresholds
+        on_threshold = np.repeat(X, 2, axis=0)
+        inner = np.flatnonzero(predictor.left != -1)
+        picks = rng.choice(inner, size=len(on_threshold))
+        on_threshold[np.arange(len(picks)), predictor.feature[picks]] = predictor.threshold[picks]
+        for label, X_check in (('training rows', X), ('horizon rows', _sample_rows(first_year, last_month_index, 5000, rng)),
+                               ('threshold rows', on_threshold)):
+            worst = check_equivalence(model, predictor, X_check)
+            print(f"✅ Matches sklearn on {len(X_check):,} {label} (max abs diff {worst:.2e})")
+
+        print(f"{'rows':>10} {'sklearn ms':>12} {'flat ms':>10} {'speedup':>8}")
+        for rows in args.rows:
+            X_bench = _sample_rows(first_year, last_month_index, rows, rng)
+            sklearn_time = _best_time(lambda: model.predict(X_bench))
+            flat_time = _best_time(lambda: predictor.predict(X_bench))
+            print(f"{rows:>10,} {sklearn_time * 1000:>12.2f} {flat_time * 1000:>10.2f} {sklearn_time / flat_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
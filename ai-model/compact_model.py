@@ -0,0 +1,359 @@
+"""Compact, sklearn-free model artifact for serving
+
+Training saves sales_model.pkl (the full estimators, used for updates and
+retraining) and next to it sales_model.npz holding only the arrays inference
+needs. The API and predictor load the .npz with NumPy alone, which keeps
+sklearn, pandas and joblib out of the serving process.
+
+The archive is written uncompressed, so with mmap_mode='r' each array is
+memory-mapped straight from the file and every process serving it shares one
+copy in the page cache. Tree ensembles also store the node tables derived for
+their traversal, so nothing model-sized is rebuilt in a private copy on load.
+"""
+import json
+import zipfile
+
+import numpy as np
+
+from atomic_files import atomic_write
+
+COMPACT_VERSION = 1
+
+NPY_HEADER_READERS = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0
+}
+
+class LinearPredictor:
+    """y = X @ coef + intercept"""
+    kind = 'linear'
+
+    def __init__(self, coef, intercept):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+
+    def arrays(self):
+        return {'coef': self.coef, 'intercept': np.array([self.intercept])}
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        return cls(arrays['coef'], arrays['intercept'][0])
+
+class LookupPredictor:
+    """y = table[X[:, column]], used for the seasonal naive model"""
+    kind = 'lookup'
+
+    def __init__(self, table, column):
+        self.table = np.asarray(table, dtype=np.float64)
+        self.column = int(column)
+
+    def predict(self, X):
+        return self.table[np.asarray(X)[:, self.column].astype(np.int64)]
+
+    def arrays(self):
+        return {'table': self.table}
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        return cls(arrays['table'], meta['column'])
+
+class TreeEnsemblePredictor:
+    """Sum of regression trees stored as flat node arrays
+
+    Every tree's nodes are concatenated into one set of arrays; roots holds the
+    offset of each tree's first node and child indexes are absolute. The
+    prediction is offset + scale * sum(leaf values), which covers both a random
+    forest (scale = 1 / n_trees) and gradient boosting (learning rate and the
+    initial constant).
+    """
+    kind = 'trees'
+
+    # Rows * trees node indexes walked at once; small blocks stay in CPU cache
+    block_size = 1 << 16
+
+    def __init__(self, feature, threshold, left, right, value, roots, scale=1.0, offset=0.0,
+                 children=None, feature_index=None):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.scale = float(scale)
+        self.offset = float(offset)
+
+        # Leaves point to themselves, so every row can take exactly depth steps in
+        # every tree without checking which ones already reached a leaf.
+        # _children[2 * node + go_left] is the next node.
+        nodes = np.arange(len(self.left))
+        leaf = self.left == -1
+        if children is None:
+            children = np.stack([
+                np.where(leaf, nodes, self.right), np.where(leaf, nodes, self.left)
+            ], axis=1).ravel()
+        self._children = np.asarray(children, dtype=np.intp)
+        self._feature = np.asarray(self.feature if feature_index is None else feature_index, dtype=np.intp)
+        self.depth = 0
+        frontier = self.roots[~leaf[self.roots]]
+        while len(frontier):
+            self.depth += 1
+            children = np.concatenate([self.left[frontier], self.right[frontier]])
+            frontier = children[~leaf[children]]
+
+    @classmethod
+    def from_trees(cls, trees, scale=1.0, offset=0.0):
+        """Flatten fitted sklearn tree_ objects"""
+        parts = {'feature': [], 'threshold': [], 'left': [], 'right': [], 'value': []}
+        roots = []
+        start = 0
+        for tree in trees:
+            leaf = tree.children_left == -1
+            roots.append(start)
+            parts['feature'].append(np.where(leaf, 0, tree.feature))
+            parts['threshold'].append(tree.threshold)
+            parts['left'].append(np.where(leaf, -1, tree.children_left + start))
+            parts['right'].append(np.where(leaf, -1, tree.children_right + start))
+            parts['value'].append(tree.value[:, 0, 0])
+            start += tree.node_count
+        flat = {name: np.concatenate(values) for name, values in parts.items()}
+        return cls(roots=roots, scale=scale, offset=offset, **flat)
+
+    def _leaf_values(self, X):
+        """Yield (start, leaf values of shape rows x trees) per block of rows"""
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        roots = self.roots.astype(np.intp)
+        block = max(1, self.block_size // max(1, len(roots)))
+        for start in range(0, n_rows, block):
+            X_flat = X[start:start + block].ravel()
+            row_offsets = np.arange(0, len(X_flat), n_features, dtype=np.intp)[:, None]
+            node = np.broadcast_to(roots, (len(row_offsets), len(roots)))
+            for _ in range(self.depth):
+                go_left = X_flat[row_offsets + self._feature[node]] <= self.threshold[node]
+                node = self._children[2 * node + go_left]
+            yield start, self.value[node]
+
+    def predict(self, X):
+        """Score every row against every tree at once, depth level by depth level"""
+        total = np.empty(len(X))
+        for start, values in self._leaf_values(X):
+            total[start:start + len(values)] = values.sum(axis=1)
+        return self.offset + self.scale * total
+
+    def predict_trees(self, X):
+        """Per-tree predictions of a random forest, shape (rows, trees)"""
+        blocks = [values for _, values in self._leaf_values(X)]
+        return self.offset + (np.vstack(blocks) if blocks else np.empty((0, len(self.roots))))
+
+    def arrays(self):
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'value': self.value,
+            'roots': self.roots,
+            'children': self._children,
+            'feature_index': self._feature
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        return cls(scale=meta['scale'], offset=meta['offset'], **arrays)
+
+PREDICTORS = {cls.kind: cls for cls in (LinearPredictor, LookupPredictor, TreeEnsemblePredictor)}
+
+def export_compact(model):
+    """Convert a fitted estimator to a compact predictor, or None if unsupported"""
+    # Imported lazily: only the training side holds sklearn estimators
+    from sklearn.linear_model import LinearRegression
+    from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+
+    if isinstance(model, LinearRegression) and np.ndim(model.coef_) == 1:
+        return LinearPredictor(model.coef_, model.intercept_)
+    if isinstance(model, RandomForestRegressor):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        return TreeEnsemblePredictor.from_trees(trees, scale=1.0 / len(trees))
+    if isinstance(model, GradientBoostingRegressor):
+        init = model.init_
+        if init == 'zero':
+            offset = 0.0
+        elif hasattr(init, 'constant_'):
+            offset = float(np.ravel(init.constant_)[0])
+        else:
+            return None
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        return TreeEnsemblePredictor.from_trees(trees, scale=model.learning_rate, offset=offset)
+    if hasattr(model, 'month_sales_') and hasattr(model, 'month_col'):
+        return LookupPredictor(model.month_sales_, model.month_col)
+    return None
+
+def _predictor_meta(predictor):
+    meta = {'kind': predictor.kind}
+    if isinstance(predictor, LookupPredictor):
+        meta['column'] = predictor.column
+    if isinstance(predictor, TreeEnsemblePredictor):
+        meta['scale'] = predictor.scale
+        meta['offset'] = predictor.offset
+    return meta
+
+def _load_predictor(arrays, prefix, meta):
+    arrays = {
+        name[len(prefix):]: values
+        for name, values in arrays.items() if name.startswith(prefix)
+    }
+    return PREDICTORS[meta['kind']].from_arrays(arrays, meta)
+
+def _mapped_arrays(filename, mmap_mode):
+    """Every array of an .npz by name, memory-mapped from the file
+
+    np.load ignores mmap_mode for archives, so each stored member is located
+    through its zip header. Compressed members cannot be mapped and are read.
+    """
+    arrays = {}
+    with zipfile.ZipFile(filename) as archive, open(filename, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+            # The member's data follows its local header: 30 bytes plus name and extra field
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = np.frombuffer(f.read(4), dtype='<u2')
+            f.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+            read_header = NPY_HEADER_READERS[np.lib.format.read_magic(f)]
+            shape, fortran_order, dtype = read_header(f)
+            if dtype.hasobject:
+                raise ValueError(f"Object arrays are not supported in compact models: {name}")
+            arrays[name] = np.memmap(f, dtype=dtype, mode=mmap_mode, offset=f.tell(), shape=shape,
+                                     order='F' if fortran_order else 'C').view(np.ndarray)
+    return arrays
+
+def save_compact(model_data, filename='sales_model.npz'):
+    """Write the serving arrays of a trained model_data dict
+
+    Returns False (and writes nothing) when the model or the series model has no
+    compact form; callers then serve from the pickle.
+    """
+    predictor = export_compact(model_data['model'])
+    if predictor is None:
+        return False
+
+    arrays = {f"model.{name}": values for name, values in predictor.arrays().items()}
+    meta = {
+        'version': COMPACT_VERSION,
+        'model': _predictor_meta(predictor),
+        'model_type': model_data['model_type'],
+        'feature_columns': list(model_data['feature_columns']),
+        'mae': model_data.get('mae'),
+        'cv_report': model_data.get('cv_report', []),
+        'timestamp': model_data.get('timestamp'),
+        # Registry version; 'version' above is the compact format's
+        'model_version': model_data.get('version'),
+        'interval': None,
+        'series': None,
+        'materialized': None
+    }
+
+    interval = model_data.get('interval')
+    if interval is not None:
+        meta['interval'] = {key: value for key, value in interval.items() if key != 'xtx_inv'}
+        if 'xtx_inv' in interval:
+            arrays['interval.xtx_inv'] = interval['xtx_inv']
+
+    bundle = model_data.get('series')
+    if bundle is not None:
+        series_meta = {
+            'strategy': bundle['strategy'],
+            'first_year': int(bundle['first_year']),
+            'feature_columns': list(bundle['feature_columns'])
+        }
+        arrays['series.series_ids'] = np.asarray(bundle['series_ids']).astype(str)
+        arrays['series.last_month_index'] = bundle['last_month_index']
+        if bundle['strategy'] == 'global':
+            series_predictor = export_compact(bundle['model'])
+            if series_predictor is None:
+                return False
+            series_meta['model'] = _predictor_meta(series_predictor)
+            arrays['series.levels'] = bundle['levels']
+            for name, values in series_predictor.arrays().items():
+                arrays[f"series.model.{name}"] = values
+        else:
+            arrays['series.coef'] = bundle['coef']
+            arrays['series.intercept'] = bundle['intercept']
+        meta['series'] = series_meta
+
+    table = model_data.get('materialized')
+    if table is not None:
+        meta['materialized'] = {key: int(table[key]) for key in ('last_month_index', 'first_year')}
+        for name, values in table.items():
+            if name not in meta['materialized']:
+                arrays[f"materialized.{name}"] = values
+
+    arrays['meta'] = np.array(json.dumps(meta, default=float))
+
+    # np.savez appends .npz to names without it, so keep the suffix on the temp file
+    with atomic_write(filename, suffix='.tmp.npz') as tmp_filename:
+        with open(tmp_filename, 'wb') as f:
+            np.savez(f, **arrays)
+    return True
+
+def load_compact(filename='sales_model.npz', mmap_mode=None):
+    """Load a compact artifact as a model_data dict with NumPy predictors
+
+    With mmap_mode='r' the arrays are memory-mapped from the file instead of read.
+    """
+    if mmap_mode:
+        arrays = _mapped_arrays(filename, mmap_mode)
+    else:
+        with np.load(filename, allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+
+    meta = json.loads(str(arrays['meta']))
+    if meta.get('version') != COMPACT_VERSION:
+        raise ValueError(f"Unsupported compact model version: {meta.get('version')}")
+
+    model_data = {
+        'model': _load_predictor(arrays, 'model.', meta['model']),
+        'model_type': meta['model_type'],
+        'feature_columns': meta['feature_columns'],
+        'mae': meta['mae'],
+        'cv_report': meta['cv_report'],
+        'timestamp': meta['timestamp'],
+        'version': meta.get('model_version'),
+        'interval': meta.get('interval'),
+        'series': None
+    }
+    if 'interval.xtx_inv' in arrays:
+        model_data['interval']['xtx_inv'] = arrays['interval.xtx_inv']
+
+    series_meta = meta['series']
+    if series_meta is not None:
+        bundle = {
+            'strategy': series_meta['strategy'],
+            'first_year': series_meta['first_year'],
+            'feature_columns': series_meta['feature_columns'],
+            'series_ids': arrays['series.series_ids'],
+            'last_month_index': arrays['series.last_month_index']
+        }
+        if bundle['strategy'] == 'global':
+            bundle['levels'] = arrays['series.levels']
+            bundle['model'] = _load_predictor(arrays, 'series.model.', series_meta['model'])
+        else:
+            bundle['coef'] = arrays['series.coef']
+            bundle['intercept'] = arrays['series.intercept']
+        model_data['series'] = bundle
+
+    if meta.get('materialized') is not None:
+        table = dict(meta['materialized'])
+        for name in arrays:
+            if name.startswith('materialized.'):
+                table[name[len('materialized.'):]] = arrays[name]
+        model_data['materialized'] = table
+
+    return model_data
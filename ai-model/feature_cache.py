@@ -0,0 +1,80 @@
+import json
+import os
+
+import numpy as np
+
+from atomic_files import atomic_write
+from features import add_calendar_features
+
+# Bump when prepare_frame or the calendar features change so stale caches are rebuilt
+CACHE_VERSION = 1
+
+def prepare_frame(csv_file='sales_data.csv'):
+    """Parse a Month,Sales CSV into the prepared training frame"""
+    import pandas as pd
+    df = pd.read_csv(csv_file)
+    df['Month'] = pd.to_datetime(df['Month'])
+    df = df.sort_values('Month', kind='stable').reset_index(drop=True)
+    return add_calendar_features(df)
+
+def cache_paths(csv_file):
+    """Binary cache and metadata files stored next to the CSV"""
+    return f"{csv_file}.cache.npy", f"{csv_file}.cache.json"
+
+def source_fingerprint(csv_file):
+    """Identify the CSV contents and cache format"""
+    stat = os.stat(csv_file)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'version': CACHE_VERSION}
+
+def _read_cache(csv_file, fingerprint):
+    """Memory-map the cached records if they were built from the same source"""
+    data_file, meta_file = cache_paths(csv_file)
+    try:
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if meta.get('fingerprint') != fingerprint:
+            return None
+        records = np.load(data_file, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    return records
+
+def _write_cache(csv_file, fingerprint, df):
+    """Store the frame as one structured .npy array, written atomically, and return it"""
+    data_file, meta_file = cache_paths(csv_file)
+    columns = {}
+    for col in df.columns:
+        values = df[col].to_numpy()
+        # Text columns become fixed-width unicode so the file needs no pickling
+        columns[col] = values.astype(str) if values.dtype == object else values
+    records = np.empty(len(df), dtype=[(col, values.dtype) for col, values in columns.items()])
+    for col, values in columns.items():
+        records[col] = values
+
+    try:
+        # The data file is replaced first, so new metadata never describes old records
+        with atomic_write(meta_file) as tmp_meta_file, atomic_write(data_file, suffix='.tmp.npy') as tmp_data_file:
+            np.save(tmp_data_file, records)
+            with open(tmp_meta_file, 'w') as f:
+                json.dump({'fingerprint': fingerprint, 'columns': list(df.columns)}, f)
+    except OSError as e:
+        print(f"⚠️  Could not write feature cache for {csv_file}: {e}")
+    return records
+
+def load_prepared_records(csv_file='sales_data.csv', prepare=prepare_frame):
+    """Return the prepared data as a structured NumPy array
+
+    Only NumPy is needed while the cache is valid; pandas is imported to parse
+    the CSV when it changed.
+    """
+    fingerprint = source_fingerprint(csv_file)
+    records = _read_cache(csv_file, fingerprint)
+    if records is None:
+        records = _write_cache(csv_file, fingerprint, prepare(csv_file))
+    return records
+
+def load_prepared_data(csv_file='sales_data.csv', prepare=prepare_frame):
+    """Return the prepared frame for csv_file, parsing the CSV only when it changed"""
+    import pandas as pd
+    records = load_prepared_records(csv_file, prepare)
+    return pd.DataFrame({col: records[col] for col in records.dtype.names})
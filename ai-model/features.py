@@ -0,0 +1,141 @@
+import numpy as np
+
+# pandas is imported inside the training helpers only, so the serving path
+# (build_month_index_features, month_labels, ...) needs nothing but NumPy
+
+# Season one-hot columns in the order pd.get_dummies produces them
+SEASONS = ['Fall', 'Spring', 'Summer', 'Winter']
+
+# Default model inputs, used for artifacts saved before the column list was persisted
+FEATURE_COLUMNS = ['Month_Num', 'Month_of_Year', 'Quarter'] + ['Season_' + season for season in SEASONS]
+
+# Month indexes are year * 12 + (month - 1); datetime64[M] counts from January 1970
+EPOCH_MONTH_INDEX = 1970 * 12
+MONTH_ABBR = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Lookup tables indexed by month of year - 1
+MONTH_SEASON = np.array([
+    'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+    'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'
+])
+MONTH_SEASONAL_FACTOR = np.array([
+    1.2, 1.2, 1.0, 1.0, 1.0, 0.9,   # Winter holiday boost, Spring baseline, slower Summer
+    0.9, 0.9, 1.1, 1.1, 1.1, 1.2    # Fall back to school/work, Winter again
+])
+
+# Category split of total sales (based on typical clothing store data)
+CATEGORY_SHARES = {
+    'Men': 0.35,
+    'Women': 0.42,
+    'Unisex': 0.18,
+    'Accessories': 0.05
+}
+
+def _build_calendar_table():
+    """Precompute the calendar features of every month of the year"""
+    month_of_year = np.arange(1, 13)
+    columns = ['Month_of_Year', 'Quarter'] + ['Season_' + season for season in SEASONS]
+    values = np.column_stack(
+        [month_of_year, (month_of_year - 1) // 3 + 1] +
+        [(MONTH_SEASON == season).astype(np.int64) for season in SEASONS]
+    )
+    return columns, values
+
+# Month of year -> calendar feature row, shared by training and serving
+CALENDAR_COLUMNS, CALENDAR_VALUES = _build_calendar_table()
+_CALENDAR_FLOAT = CALENDAR_VALUES.astype(np.float64)
+_CALENDAR_INDEX = {col: j for j, col in enumerate(CALENDAR_COLUMNS)}
+
+def month_numbers(dates, first_year=None):
+    """Number months consecutively from January of the first year in the data"""
+    import pandas as pd
+    dates = pd.DatetimeIndex(dates)
+    years = dates.year.to_numpy()
+    if first_year is None:
+        first_year = years.min()
+    return dates.month.to_numpy() + 12 * (years - first_year)
+
+def add_calendar_features(df, date_col='Month'):
+    """Add Month_Num, Year, Season and the calendar table columns to a monthly frame"""
+    import pandas as pd
+    dates = pd.DatetimeIndex(df[date_col])
+    month_of_year = dates.month.to_numpy()
+
+    calendar = CALENDAR_VALUES[month_of_year - 1]
+    features = pd.DataFrame(calendar, columns=CALENDAR_COLUMNS, index=df.index)
+    features.insert(0, 'Month_Num', month_numbers(dates))
+    features.insert(2, 'Year', dates.year.to_numpy())
+    features.insert(4, 'Season', MONTH_SEASON[month_of_year - 1])
+    return pd.concat([df, features], axis=1)
+
+def build_feature_matrix(month_num, month_of_year, feature_columns=None):
+    """Assemble model inputs in the exact column order the model was trained with"""
+    if feature_columns is None:
+        feature_columns = FEATURE_COLUMNS
+
+    calendar = _CALENDAR_FLOAT[np.asarray(month_of_year) - 1]
+    X = np.empty((len(calendar), len(feature_columns)), dtype=np.float64)
+    for j, col in enumerate(feature_columns):
+        X[:, j] = month_num if col == 'Month_Num' else calendar[:, _CALENDAR_INDEX[col]]
+    return X
+
+def build_month_index_features(month_index, first_year, feature_columns=None):
+    """Feature matrix for absolute month indexes, Month_Num counted from first_year"""
+    month_index = np.asarray(month_index, dtype=np.int64)
+    return build_feature_matrix(month_index - first_year * 12 + 1, month_index % 12 + 1, feature_columns)
+
+def horizon_month_index(last_month_index, months_ahead):
+    """Month indexes of the months_ahead months after last_month_index"""
+    return int(last_month_index) + np.arange(1, months_ahead + 1)
+
+def month_labels(month_index, fmt='%b %Y'):
+    """Format month indexes as '%b %Y', '%Y-%m' or '%Y-%m-%d' (first of month) strings
+
+    Each distinct month is formatted once, so this stays cheap for many series.
+    """
+    month_index = np.asarray(month_index, dtype=np.int64)
+    months, inverse = np.unique(month_index, return_inverse=True)
+    years, month_of_year = months // 12, months % 12 + 1
+    if fmt == '%b %Y':
+        labels = [f"{MONTH_ABBR[m - 1]} {y}" for y, m in zip(years, month_of_year)]
+    elif fmt == '%Y-%m':
+        labels = [f"{y:04d}-{m:02d}" for y, m in zip(years, month_of_year)]
+    elif fmt == '%Y-%m-%d':
+        labels = [f"{y:04d}-{m:02d}-01" for y, m in zip(years, month_of_year)]
+    else:
+        raise ValueError(f"Unsupported month format: {fmt}")
+    return np.asarray(labels)[inverse.reshape(month_index.shape)]
+
+def build_horizon_features(last_date, last_month_num, months_ahead, feature_columns=None):
+    """Build the feature matrix for every month of the forecast horizon in one pass
+
+    Returns (dates, X, seasons) where X has one row per future month with the
+    columns listed in feature_columns (FEATURE_COLUMNS by default).
+    """
+    import pandas as pd
+    steps = np.arange(1, months_ahead + 1)
+    months = np.datetime64(pd.Timestamp(last_date), 'M') + steps
+    month_of_year = months.astype(np.int64) % 12 + 1
+
+    X = build_feature_matrix(last_month_num + steps, month_of_year, feature_columns)
+    dates = pd.DatetimeIndex(months.astype('datetime64[ns]'))
+    return dates, X, MONTH_SEASON[month_of_year - 1]
+
+def seasonal_factors(month_of_year):
+    """Get the business seasonal multiplier for each forecast month (1-12)"""
+    return MONTH_SEASONAL_FACTOR[np.asarray(month_of_year) - 1]
+
+def determine_trends(adjusted_preds, base_preds, steps=None):
+    """Classify each forecast month as Growing, Stable or Declining
+
+    steps gives each row's months ahead (1, 2, ...) and defaults to a single horizon.
+    """
+    adjusted_preds = np.asarray(adjusted_preds)
+    base_preds = np.asarray(base_preds)
+    if steps is None:
+        steps = np.arange(1, len(adjusted_preds) + 1)
+    return np.select(
+        [steps <= 2, adjusted_preds > base_preds * 1.05, adjusted_preds < base_preds * 0.95],
+        ['Growing', 'Growing', 'Declining'],
+        default='Stable'
+    )
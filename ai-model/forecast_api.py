@@ -1,94 +1,281 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, g
 from flask_cors import CORS
-import pandas as pd
 from datetime import datetime, timedelta
-from joblib import load
+from collections import OrderedDict
 import numpy as np
+import threading
 import json
+import math
 import os
+import time
+
+from sales_history import HistoryLoader
+from training_jobs import TrainingJobs
+from series_forecast import predict_series
+from compact_model import load_compact
+from model_registry import ModelRegistry
+from mongo_source import MongoSalesSource, sync_model
+from metrics import metrics
+from responses import accepts_gzip, encode, etag_matches, first_months, forecast_etag, to_columns
+from intervals import DEFAULT_LEVEL
+from forecast_table import MAX_MONTHS_AHEAD, forecast_table, table_columns, table_rows
+from features import CATEGORY_SHARES, FEATURE_COLUMNS, month_labels, seasonal_factors, determine_trends
+
+# sklearn, pandas and joblib are only imported when training or when no compact
+# model exists, which keeps startup and inference light
+def train_model(**kwargs):
+    from forecast_model import train_model as _train_model
+    return _train_model(**kwargs)
+
+def update_model(**kwargs):
+    from forecast_model import update_model as _update_model
+    return _update_model(**kwargs)
 
 app = Flask(__name__)
 CORS(app)
 
+# Upper bound on queries accepted by POST /api/forecast/batch
+MAX_BATCH_QUERIES = 100
+
+class ForecastCache:
+    """Bounded LRU cache for computed forecasts"""
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached forecasts"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """Get cache counters"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
 class ForecastAPI:
-    def __init__(self):
+    def __init__(self, data_file='sales_data.csv', model_file='sales_model.pkl',
+                 mmap_model=os.environ.get('FORECAST_MMAP_MODEL') == '1'):
         self.model_data = None
         self.model = None
         self.model_type = None
+        self.feature_columns = FEATURE_COLUMNS
+        self.data_file = data_file
+        self.model_file = model_file
+        self.compact_file = os.path.splitext(model_file)[0] + '.npz'
+        self.mmap_model = mmap_model
+        self.model_fingerprint = None
+        self.previous_model_data = None
+        self.registry = ModelRegistry(model_file=model_file)
+        self.history = HistoryLoader(data_file)
+        self.cache = ForecastCache()
+        # Encoded response bodies by ETag and content encoding
+        self.responses = ForecastCache(max_entries=256)
         self.load_model()
+        self._load_history()
     
     def load_model(self):
-        """Load the trained model"""
+        """Load the trained model
+        
+        The compact sales_model.npz is preferred: it needs NumPy only. Otherwise the
+        full pickle is loaded. With mmap_model the NumPy arrays of either file are
+        memory-mapped read-only, so every worker process shares one copy in the
+        page cache. The registry version comes from the artifact itself, so it
+        always matches the loaded model even while a promotion is in progress.
+        """
+        mmap_mode = 'r' if self.mmap_model else None
         try:
-            self.model_data = load('sales_model.pkl')
-            self.model = self.model_data['model']
-            self.model_type = self.model_data['model_type']
+            with metrics.stage('load_model'):
+                if os.path.exists(self.compact_file):
+                    model_data = load_compact(self.compact_file, mmap_mode=mmap_mode)
+                else:
+                    from joblib import load
+                    model_data = load(self.model_file, mmap_mode=mmap_mode)
+            self.swap_model(model_data)
             print(f"✅ Loaded {self.model_type} model")
         except FileNotFoundError:
             print("⚠️  Model file not found. Using fallback predictions.")
             self.model = None
+            self.model_fingerprint = None
+            self.cache.clear()
+            self.responses.clear()
     
-    def predict_sales(self, months_ahead=6):
-        """Generate sales predictions"""
-        if not self.model:
-            return self._fallback_predictions(months_ahead)
+    def _model_file_fingerprint(self):
+        """Identify the served model file on disk by modification time and size"""
+        model_file = self.compact_file if os.path.exists(self.compact_file) else self.model_file
+        try:
+            stat = os.stat(model_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def refresh_model(self):
+        """Reload the model if another process replaced the model file"""
+        fingerprint = self._model_file_fingerprint()
+        if fingerprint is not None and fingerprint != self.model_fingerprint:
+            self.load_model()
+    
+    def swap_model(self, model_data):
+        """Start serving a new model
+        
+        Predictions read self.model_data once per request, so replacing that single
+        reference swaps the model atomically for in-flight requests. The replaced
+        model stays loaded as previous_model_data for an instant rollback.
+        """
+        table = model_data.get('materialized')
+        if table is not None and 'materialized_forecasts' not in model_data:
+            # Response rows for every horizon, built once so lookups copy nothing
+            rows = table_rows(table)
+            model_data['materialized_forecasts'] = {
+                'last_month_index': int(table['last_month_index']),
+                'first_year': int(table['first_year']),
+                'sales': [rows[:months_ahead] for months_ahead in range(len(rows) + 1)],
+                'columns': table_columns(table),
+                'categories': dict(zip(table['category_names'].tolist(), table['category_sales'].tolist()))
+            }
+        if self.model_data is not None and self.model_data is not model_data:
+            self.previous_model_data = self.model_data
+        self.model_data = model_data
+        self.model = model_data['model']
+        self.model_type = model_data['model_type']
+        self.feature_columns = model_data.get('feature_columns', FEATURE_COLUMNS)
+        self.model_fingerprint = self._model_file_fingerprint()
+        self.cache.clear()
+        self.responses.clear()
+        metrics.inc('forecast_model_loads_total')
+    
+    def promote(self, version):
+        """Serve a registered model version, in this process and for every worker
         
+        The version is loaded before the served files are replaced, so requests keep
+        using the current model until the new one is ready. Raises KeyError for
+        unknown versions.
+        """
+        model_data = self.registry.load(version, mmap_mode='r' if self.mmap_model else None)
+        self.registry.promote(version)
+        self.swap_model(model_data)
+        return model_data
+    
+    def rollback(self):
+        """Swap back to the previously served model, which is still in memory
+        
+        Raises ValueError when no model was served before the current one.
+        """
+        previous = self.previous_model_data
+        if previous is None:
+            raise ValueError('No previous model to roll back to')
+        if previous.get('version'):
+            # Replace the served files too so other workers follow
+            self.registry.promote(previous['version'])
+        self.swap_model(previous)
+        return previous
+    
+    def _load_history(self):
+        """Get the resident sales history, reloading it if the file changed"""
         try:
-            # Load reference data
-            df = pd.read_csv('sales_data.csv')
-            df['Month'] = pd.to_datetime(df['Month'])
-            df['Month_Num'] = df['Month'].dt.month + 12 * (df['Month'].dt.year - df['Month'].dt.year.min())
-            
-            last_row = df.iloc[-1]
-            last_month_num = last_row['Month_Num']
-            last_date = last_row['Month']
-            
-            predictions = []
-            
-            for i in range(1, months_ahead + 1):
-                future_date = pd.to_datetime(last_date) + pd.DateOffset(months=i)
-                future_month_num = last_month_num + i
-                future_month_of_year = future_date.month
-                future_quarter = future_date.quarter
-                
-                season = {
-                    12: 'Winter', 1: 'Winter', 2: 'Winter',
-                    3: 'Spring', 4: 'Spring', 5: 'Spring',
-                    6: 'Summer', 7: 'Summer', 8: 'Summer',
-                    9: 'Fall', 10: 'Fall', 11: 'Fall'
-                }[future_month_of_year]
-                
-                features = [
-                    future_month_num, future_month_of_year, future_quarter,
-                    1 if season == 'Fall' else 0,
-                    1 if season == 'Spring' else 0,
-                    1 if season == 'Summer' else 0,
-                    1 if season == 'Winter' else 0
-                ]
-                
-                pred = self.model.predict([features])[0]
-                
-                seasonal_factor = {
-                    'Winter': 1.2, 'Spring': 1.0, 'Summer': 0.9, 'Fall': 1.1
-                }[season]
-                
-                adjusted_pred = pred * seasonal_factor
-                
-                predictions.append({
-                    'month': future_date.strftime('%b %Y'),
-                    'predictedSales': round(adjusted_pred, 2),
-                    'actualSales': 0,
-                    'trend': self._determine_trend(i, adjusted_pred, pred)
-                })
-            
-            return predictions
+            return self.history.get()
+        except Exception as e:
+            print(f"Error loading sales history: {e}")
+            return None
+    
+    def _materialized_forecasts(self, model_data, history):
+        """The model's precomputed forecasts if they were made for this history, else None"""
+        materialized = model_data.get('materialized_forecasts') if model_data else None
+        if (materialized is None or history is None
+                or materialized['last_month_index'] != history.last_month_index
+                or materialized['first_year'] != history.first_year):
+            return None
+        return materialized
+    
+    def forecast_etag(self, *parts):
+        """ETag of a forecast response for the served model and history, None for fallbacks"""
+        return forecast_etag(self.model_data if self.model else None, self._load_history(), *parts)
+    
+    def encoded_response(self, etag, gzip_ok, build_payload):
+        """(body, gzipped) of a forecast response, encoded once per ETag and encoding
+        
+        build_payload is only called on a miss, so a cached body keeps the
+        generated_at of the request that computed it.
+        """
+        key = (etag, gzip_ok)
+        encoded = self.responses.get(key) if etag else None
+        if encoded is None:
+            encoded = encode(build_payload(), gzip_ok)
+            if etag:
+                self.responses.put(key, encoded)
+        return encoded
+    
+    def _cache_key(self, months_ahead, model_data, history, columnar=False):
+        """Build the cache key for a forecast request"""
+        return (months_ahead, model_data.get('timestamp'), history.fingerprint, columnar)
+    
+    def predict_sales(self, months_ahead=6, columnar=False):
+        """Generate sales predictions, one dict per month or with columnar one list per field"""
+        model_data = self.model_data
+        if not self.model or not model_data:
+            return self._fallback_predictions(months_ahead, columnar)
+        
+        with metrics.stage('history'):
+            history = self._load_history()
+        if history is None:
+            return self._fallback_predictions(months_ahead, columnar)
+        
+        # Forecasts materialized at training time are a plain lookup
+        materialized = self._materialized_forecasts(model_data, history)
+        if materialized is not None and months_ahead < len(materialized['sales']):
+            metrics.inc('forecast_materialized_hits_total')
+            if columnar:
+                return first_months(materialized['columns'], months_ahead)
+            return materialized['sales'][months_ahead]
+        
+        key = self._cache_key(months_ahead, model_data, history, columnar)
+        predictions = self.cache.get(key)
+        if predictions is None:
+            predictions = self._compute_predictions(months_ahead, model_data, history, columnar)
+            if predictions is None:
+                return self._fallback_predictions(months_ahead, columnar)
+            self.cache.put(key, predictions)
+        return predictions
+    
+    def _compute_predictions(self, months_ahead, model_data, history, columnar=False):
+        """Run the model for the requested horizon, or None on failure"""
+        try:
+            table = forecast_table(model_data, history.last_month_index, history.first_year, months_ahead)
+            return table_columns(table) if columnar else table_rows(table)
             
         except Exception as e:
             print(f"Error in prediction: {e}")
-            return self._fallback_predictions(months_ahead)
+            return None
     
-    def _fallback_predictions(self, months_ahead=6):
+    def _fallback_predictions(self, months_ahead=6, columnar=False):
         """Fallback predictions when model is not available"""
+        metrics.inc('forecast_fallback_predictions_total')
         base_amount = 2500
         predictions = []
         
@@ -108,7 +295,7 @@ class ForecastAPI:
                 'trend': 'Growing' if i <= 3 else 'Stable'
             })
         
-        return predictions
+        return to_columns(predictions) if columnar else predictions
     
     def _get_seasonal_factor(self, month):
         """Get seasonal factor for a given month"""
@@ -120,30 +307,200 @@ class ForecastAPI:
         }
         return seasonal_factors.get(month, 1.0)
     
-    def _determine_trend(self, month_index, current_pred, base_pred):
-        """Determine trend direction"""
-        if month_index <= 2:
-            return "Growing"
-        elif current_pred > base_pred * 1.05:
-            return "Growing"
-        elif current_pred < base_pred * 0.95:
-            return "Declining"
-        else:
-            return "Stable"
+    def predict_series(self, series_ids, months_ahead=6, columnar=False):
+        """Forecast many store/category series in one batched model call
+        
+        Returns ({series_id: [predictions]}, missing_ids), with columnar one list
+        per field for each series. Raises ValueError when the loaded model was
+        trained without series data.
+        """
+        model_data = self.model_data
+        bundle = model_data.get('series') if model_data else None
+        if not bundle:
+            raise ValueError('No series models trained. Add series_sales.csv and retrain.')
+        
+        key = ('series', tuple(series_ids), months_ahead, model_data.get('timestamp'), columnar)
+        result = self.cache.get(key)
+        if result is None:
+            with metrics.stage('series_predict'):
+                found, missing, month_index, base_preds = predict_series(bundle, series_ids, months_ahead)
+            
+            # Same business adjustments as the single-series forecast, for all rows at once
+            with metrics.stage('postprocess'):
+                flat_month_index = month_index.ravel()
+                flat_base = base_preds.ravel()
+                adjusted_preds = flat_base * seasonal_factors(flat_month_index % 12 + 1)
+                steps = np.tile(np.arange(1, months_ahead + 1), len(found))
+                trends = determine_trends(adjusted_preds, flat_base, steps)
+                
+                labels = month_labels(flat_month_index).tolist()
+                sales = np.round(adjusted_preds, 2).tolist()
+                trends = trends.tolist()
+                if columnar:
+                    forecasts = {
+                        sid: {
+                            'month': labels[i * months_ahead:(i + 1) * months_ahead],
+                            'predictedSales': sales[i * months_ahead:(i + 1) * months_ahead],
+                            'actualSales': [0] * months_ahead,
+                            'trend': trends[i * months_ahead:(i + 1) * months_ahead]
+                        }
+                        for i, sid in enumerate(found)
+                    }
+                else:
+                    rows = [
+                        {
+                            'month': month,
+                            'predictedSales': value,
+                            'actualSales': 0,
+                            'trend': trend
+                        }
+                        for month, value, trend in zip(labels, sales, trends)
+                    ]
+                    forecasts = {
+                        sid: rows[i * months_ahead:(i + 1) * months_ahead]
+                        for i, sid in enumerate(found)
+                    }
+            result = (forecasts, missing)
+            self.cache.put(key, result)
+        return result
     
     def predict_categories(self):
         """Predict category-wise sales"""
-        base_prediction = 3500  # Base monthly prediction
+        model_data = self.model_data
+        materialized = self._materialized_forecasts(model_data, self._load_history())
+        if materialized is not None:
+            metrics.inc('forecast_materialized_hits_total')
+            return dict(materialized['categories'])
+        
+        # Use per-category series models when the model was trained with them
+        bundle = model_data.get('series') if model_data else None
+        if bundle and set(CATEGORY_SHARES).issubset(bundle['series_ids']):
+            forecasts, _ = self.predict_series(list(CATEGORY_SHARES), months_ahead=1)
+            return {category: rows[0]['predictedSales'] for category, rows in forecasts.items()}
+        
+        base_prediction = 3500  # Fallback monthly prediction
         
+        # Split next month's model forecast when the model and history are available
+        if self.model and self._load_history() is not None:
+            base_prediction = self.predict_sales(months_ahead=1)[0]['predictedSales']
+        
+        return self._split_categories(base_prediction)
+    
+    def _split_categories(self, base_prediction):
+        """Split a total monthly forecast by the fixed category shares"""
         return {
-            'Men': round(base_prediction * 0.35, 2),
-            'Women': round(base_prediction * 0.42, 2),
-            'Unisex': round(base_prediction * 0.18, 2),
-            'Accessories': round(base_prediction * 0.05, 2)
+            category: round(base_prediction * share, 2)
+            for category, share in CATEGORY_SHARES.items()
         }
+    
+    def predict_batch(self, queries, columnar=False):
+        """Answer many forecast queries with at most one model call per model kind
+        
+        Each query is a dict with 'months', 'series' (list of ids, empty for the
+        total sales forecast) and 'include_categories'. The total forecast is computed
+        once for the longest requested horizon and the series forecast once for the
+        union of requested series, then sliced per query. Raises ValueError when
+        series are requested from a model trained without them.
+        """
+        model_data = self.model_data
+        bundle = model_data.get('series') if model_data else None
+        category_series = bool(bundle) and set(CATEGORY_SHARES).issubset(bundle['series_ids'])
+        need_categories = any(query['include_categories'] for query in queries)
+        materialized = self._materialized_forecasts(model_data, self._load_history()) if need_categories else None
+        
+        total_months = [query['months'] for query in queries if not query['series']]
+        series_ids = list(dict.fromkeys(sid for query in queries for sid in query['series']))
+        series_months = [query['months'] for query in queries if query['series']]
+        if need_categories and materialized is None and category_series:
+            series_ids += [category for category in CATEGORY_SHARES if category not in series_ids]
+            series_months.append(1)
+        elif need_categories and materialized is None:
+            total_months.append(1)
+        
+        def next_month_sales(forecast):
+            return forecast['predictedSales'][0] if columnar else forecast[0]['predictedSales']
+        
+        sales = self.predict_sales(max(total_months), columnar) if total_months else []
+        series_forecasts = {}
+        if series_ids:
+            series_forecasts, _ = self.predict_series(series_ids, max(series_months), columnar)
+        
+        categories = None
+        if materialized is not None:
+            metrics.inc('forecast_materialized_hits_total')
+            categories = dict(materialized['categories'])
+        elif need_categories and category_series:
+            categories = {category: next_month_sales(series_forecasts[category]) for category in CATEGORY_SHARES}
+        elif need_categories:
+            has_model_forecast = self.model and self._load_history() is not None
+            categories = self._split_categories(next_month_sales(sales) if has_model_forecast else 3500)
+        
+        results = []
+        for query in queries:
+            months_ahead = query['months']
+            if query['series']:
+                result = {
+                    'months': months_ahead,
+                    'series': {
+                        sid: first_months(series_forecasts[sid], months_ahead)
+                        for sid in query['series'] if sid in series_forecasts
+                    },
+                    'missing': [sid for sid in query['series'] if sid not in series_forecasts]
+                }
+            else:
+                result = {'months': months_ahead, 'forecast': first_months(sales, months_ahead)}
+            if query['include_categories']:
+                result['categories'] = categories
+            results.append(result)
+        return results
 
 # Initialize forecast API
 forecast_api = ForecastAPI()
+# Job records live under models/jobs/ so every worker process can report them
+training_jobs = TrainingJobs(train_model, on_complete=forecast_api.swap_model,
+                             jobs_dir=os.path.join(forecast_api.registry.root, 'jobs'))
+# Monthly sales straight from the POS database when FORECAST_MONGO_URI is set
+mongo_source = MongoSalesSource.from_env()
+
+def _collect_metrics():
+    """Values read from the served model and caches when /metrics is scraped"""
+    api = forecast_api
+    cache = api.cache.stats()
+    model_data = api.model_data or {}
+    return [
+        ('forecast_cache_requests_total', (('result', 'hit'),), cache['hits']),
+        ('forecast_cache_requests_total', (('result', 'miss'),), cache['misses']),
+        ('forecast_cache_entries', (), cache['entries']),
+        ('forecast_history_reloads_total', (), api.history.reloads),
+        ('forecast_model_info', (
+            ('model_type', api.model_type or 'Fallback'),
+            ('version', model_data.get('version') or model_data.get('timestamp') or 'none')
+        ), 1)
+    ]
+
+metrics.register_collector(_collect_metrics)
+
+@app.before_request
+def start_request_timer():
+    """Note the request start for the latency histogram"""
+    if metrics.enabled:
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and observe its latency by route"""
+    start = g.get('request_start') if metrics.enabled else None
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = (('route', route), ('method', request.method))
+        metrics.observe('forecast_http_request_duration_seconds', time.perf_counter() - start, labels)
+        metrics.inc('forecast_http_requests_total', labels + (('status', response.status_code),))
+    return response
+
+@app.before_request
+def refresh_model():
+    """Pick up models saved by other worker processes or by forecast_model.py"""
+    forecast_api.refresh_model()
 
 @app.route('/')
 def home():
@@ -154,38 +511,169 @@ def home():
         'timestamp': datetime.now().isoformat()
     })
 
+def _forecast_response(etag, build_payload):
+    """Send a forecast encoded with the fast JSON encoder
+    
+    With an etag, a matching If-None-Match is answered 304 without building the
+    payload, and encoded bodies are reused. Bodies are gzipped for clients that
+    accept it.
+    """
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        response = app.response_class(status=304)
+    else:
+        body, gzipped = forecast_api.encoded_response(
+            etag, accepts_gzip(request.headers.get('Accept-Encoding')), build_payload
+        )
+        response = app.response_class(body, mimetype='application/json')
+        if gzipped:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/api/forecast/sales', methods=['GET'])
 def get_sales_forecast():
-    """Get sales forecast for specified months"""
+    """Get sales forecast for specified months
+    
+    ?format=columnar returns parallel arrays per field instead of one object per month.
+    """
     try:
         months_ahead = request.args.get('months', 6, type=int)
-        if months_ahead < 1 or months_ahead > 24:
+        if months_ahead < 1 or months_ahead > MAX_MONTHS_AHEAD:
             months_ahead = 6
+        columnar = request.args.get('format') == 'columnar'
         
-        predictions = forecast_api.predict_sales(months_ahead)
+        # ?series=store1-Men,store2-Women forecasts many series in one batched call
+        series = request.args.get('series')
+        if series:
+            series_ids = list(dict.fromkeys(sid.strip() for sid in series.split(',') if sid.strip()))
+            
+            def build_series_payload():
+                forecasts, missing = forecast_api.predict_series(series_ids, months_ahead, columnar)
+                return {
+                    'success': True,
+                    'series': forecasts,
+                    'missing': missing,
+                    'model_type': forecast_api.model_type or 'Fallback',
+                    'generated_at': datetime.now().isoformat()
+                }
+            
+            try:
+                return _forecast_response(
+                    forecast_api.forecast_etag('series', tuple(series_ids), months_ahead, columnar),
+                    build_series_payload
+                )
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+        
+        def build_payload():
+            return {
+                'success': True,
+                'forecast': forecast_api.predict_sales(months_ahead, columnar),
+                'model_type': forecast_api.model_type or 'Fallback',
+                'generated_at': datetime.now().isoformat()
+            }
         
+        return _forecast_response(forecast_api.forecast_etag('sales', months_ahead, columnar), build_payload)
+        
+    except Exception as e:
         return jsonify({
-            'success': True,
-            'forecast': predictions,
-            'model_type': forecast_api.model_type or 'Fallback',
-            'generated_at': datetime.now().isoformat()
-        })
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _request_object():
+    """The JSON request body ({} when missing or invalid), or None when it is not an object"""
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return {}
+    return payload if isinstance(payload, dict) else None
+
+@app.route('/api/forecast/batch', methods=['POST'])
+def get_batch_forecast():
+    """Answer several forecast queries in one request
+    
+    Body: {"queries": [{"months": 6}, {"months": 12, "series": ["store1-Men"]},
+                       {"months": 3, "include_categories": true}]}
+    """
+    payload = _request_object()
+    if payload is None:
+        return jsonify({
+            'success': False,
+            'error': 'Expected a JSON object body'
+        }), 400
+    raw_queries = payload.get('queries')
+    if not isinstance(raw_queries, list) or not raw_queries:
+        return jsonify({
+            'success': False,
+            'error': 'Expected a non-empty "queries" list'
+        }), 400
+    if len(raw_queries) > MAX_BATCH_QUERIES:
+        return jsonify({
+            'success': False,
+            'error': f'At most {MAX_BATCH_QUERIES} queries per batch'
+        }), 400
+    
+    queries = []
+    for raw in raw_queries:
+        if not isinstance(raw, dict):
+            return jsonify({
+                'success': False,
+                'error': 'Each query must be an object'
+            }), 400
+        try:
+            months_ahead = int(raw.get('months', 6))
+        except (TypeError, ValueError):
+            months_ahead = 6
+        if months_ahead < 1 or months_ahead > MAX_MONTHS_AHEAD:
+            months_ahead = 6
         
+        series = raw.get('series') or []
+        if isinstance(series, str):
+            series = series.split(',')
+        elif not isinstance(series, list):
+            return jsonify({
+                'success': False,
+                'error': '"series" must be a list or a comma-separated string'
+            }), 400
+        queries.append({
+            'months': months_ahead,
+            'series': list(dict.fromkeys(str(sid).strip() for sid in series if str(sid).strip())),
+            'include_categories': bool(raw.get('include_categories', False))
+        })
+    
+    try:
+        results = forecast_api.predict_batch(queries, request.args.get('format') == 'columnar')
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
+    
+    return _forecast_response(None, lambda: {
+        'success': True,
+        'results': results,
+        'model_type': forecast_api.model_type or 'Fallback',
+        'generated_at': datetime.now().isoformat()
+    })
 
 @app.route('/api/forecast/categories', methods=['GET'])
 def get_category_forecast():
     """Get category-wise sales forecast"""
     try:
-        categories = forecast_api.predict_categories()
-        
-        return jsonify({
+        return _forecast_response(forecast_api.forecast_etag('categories'), lambda: {
             'success': True,
-            'categories': categories,
+            'categories': forecast_api.predict_categories(),
             'generated_at': datetime.now().isoformat()
         })
         
@@ -195,6 +683,16 @@ def get_category_forecast():
             'error': str(e)
         }), 500
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics for this process (disabled with FORECAST_METRICS=0)"""
+    if not metrics.enabled:
+        return jsonify({
+            'success': False,
+            'error': 'Metrics are disabled'
+        }), 404
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/api/model/info', methods=['GET'])
 def get_model_info():
     """Get model information"""
@@ -202,21 +700,31 @@ def get_model_info():
         'model_type': forecast_api.model_type or 'Fallback',
         'model_loaded': forecast_api.model is not None,
         'last_updated': forecast_api.model_data.get('timestamp') if forecast_api.model_data else None,
+        'version': forecast_api.model_data.get('version') if forecast_api.model_data else None,
+        'cache': forecast_api.cache.stats(),
+        'response_cache': forecast_api.responses.stats(),
+        'interval': {
+            'method': forecast_api.model_data['interval']['method'],
+            'level': DEFAULT_LEVEL
+        } if forecast_api.model_data and forecast_api.model_data.get('interval') else None,
+        'materialized': forecast_api._materialized_forecasts(
+            forecast_api.model_data, forecast_api._load_history()
+        ) is not None,
         'api_version': '1.0.0'
     })
 
 @app.route('/api/model/retrain', methods=['POST'])
 def retrain_model():
-    """Retrain the model (simplified version)"""
+    """Queue a background retrain on the current sales data"""
     try:
-        # In a real implementation, this would retrain with new data
-        forecast_api.load_model()  # Reload the model
+        job = training_jobs.submit(csv_file=forecast_api.data_file, model_file=forecast_api.model_file)
         
         return jsonify({
             'success': True,
-            'message': 'Model reloaded successfully',
+            'message': 'Model retraining queued',
+            'job': job,
             'model_type': forecast_api.model_type or 'Fallback'
-        })
+        }), 202
         
     except Exception as e:
         return jsonify({
@@ -224,6 +732,177 @@ def retrain_model():
             'error': str(e)
         }), 500
 
+def _observation(obs):
+    """Validate one appended {"month": "YYYY-MM", "sales": value} observation
+
+    Raises KeyError, TypeError or ValueError so bad rows are rejected before a
+    job is queued rather than failing inside it.
+    """
+    month = datetime.strptime(obs['month'], '%Y-%m').strftime('%Y-%m')
+    sales = float(obs['sales'])
+    if not math.isfinite(sales):
+        raise ValueError(f"sales for {month} must be a finite number")
+    return {'Month': month, 'Sales': sales}
+
+@app.route('/api/data/append', methods=['POST'])
+def append_sales_data():
+    """Append new monthly observations and update the model incrementally
+    
+    Body: {"observations": [{"month": "2025-01", "sales": 5100}],
+           "series": [{"series_id": "store1-Men", "month": "2025-01", "sales": 820}]}
+    """
+    payload = _request_object()
+    if payload is None:
+        return jsonify({
+            'success': False,
+            'error': 'Expected a JSON object body'
+        }), 400
+    try:
+        observations = [_observation(obs) for obs in payload.get('observations', [])]
+        series_observations = [
+            dict(_observation(obs), series_id=str(obs['series_id']))
+            for obs in payload.get('series', [])
+        ]
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid observation: {e}'
+        }), 400
+    
+    if not observations and not series_observations:
+        return jsonify({
+            'success': False,
+            'error': 'No observations provided'
+        }), 400
+    if forecast_api.model is None:
+        return jsonify({
+            'success': False,
+            'error': 'No trained model to update. Retrain first.'
+        }), 409
+    
+    # Runs on the retrain worker so updates and full retrains never overlap
+    job = training_jobs.submit(
+        kind='append',
+        train_fn=update_model,
+        coalesce=False,
+        observations=observations,
+        csv_file=forecast_api.data_file,
+        model_file=forecast_api.model_file,
+        series_observations=series_observations
+    )
+    
+    return jsonify({
+        'success': True,
+        'message': f'Queued update with {len(observations)} months and {len(series_observations)} series rows',
+        'job': job
+    }), 202
+
+@app.route('/api/data/sync', methods=['POST'])
+def sync_sales_data():
+    """Pull new sales from MongoDB (FORECAST_MONGO_URI) and update the model"""
+    if mongo_source is None:
+        return jsonify({
+            'success': False,
+            'error': 'No MongoDB source configured. Set FORECAST_MONGO_URI.'
+        }), 409
+    
+    job = training_jobs.submit(
+        kind='sync',
+        train_fn=sync_model,
+        source=mongo_source,
+        csv_file=forecast_api.data_file,
+        model_file=forecast_api.model_file
+    )
+    
+    return jsonify({
+        'success': True,
+        'message': 'MongoDB sync queued',
+        'job': job
+    }), 202
+
+@app.route('/api/model/versions', methods=['GET'])
+def get_model_versions():
+    """List registered model versions and the one being served"""
+    previous = forecast_api.previous_model_data
+    return jsonify({
+        'success': True,
+        'versions': forecast_api.registry.list(),
+        'active': forecast_api.registry.active(),
+        'serving': forecast_api.model_data.get('version') if forecast_api.model_data else None,
+        'warm_previous': previous.get('version') if previous else None
+    })
+
+@app.route('/api/model/promote', methods=['POST'])
+def promote_model():
+    """Serve a registered model version
+    
+    Body: {"version": "v0003"}
+    """
+    payload = _request_object()
+    if payload is None:
+        return jsonify({
+            'success': False,
+            'error': 'Expected a JSON object body'
+        }), 400
+    version = payload.get('version')
+    if not isinstance(version, str) or not version:
+        return jsonify({
+            'success': False,
+            'error': 'Expected a "version" string'
+        }), 400
+    
+    try:
+        model_data = forecast_api.promote(version)
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e.args[0])
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'version': version,
+        'model_type': model_data['model_type']
+    })
+
+@app.route('/api/model/rollback', methods=['POST'])
+def rollback_model():
+    """Swap back to the previously served model"""
+    try:
+        model_data = forecast_api.rollback()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 409
+    except KeyError as e:
+        # The warm previous model's version was pruned from the registry
+        return jsonify({
+            'success': False,
+            'error': str(e.args[0])
+        }), 409
+    
+    return jsonify({
+        'success': True,
+        'version': model_data.get('version'),
+        'model_type': model_data['model_type']
+    })
+
+@app.route('/api/model/retrain/<job_id>', methods=['GET'])
+def get_retrain_status(job_id):
+    """Get the status of a retraining job"""
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown job {job_id}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
 if __name__ == '__main__':
     print("🚀 Starting AI Forecast API Server")
     print("📊 Model Type:", forecast_api.model_type or 'Fallback')
@@ -0,0 +1,212 @@
+"""Async (ASGI) variant of the forecast API
+
+    uvicorn forecast_asgi:app --port 5001
+
+The forecast endpoints run here on asyncio: model reloads, history reads,
+predictions and response encoding run in a thread pool so the event loop never
+blocks on file I/O, sklearn or gzip, and concurrent requests for the same
+forecast and model version share a single in-flight computation. Responses
+get the same ETag revalidation, gzip and encoded-body cache as the Flask app (see
+responses). Every other route is served by the Flask app in forecast_api.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+from forecast_api import app as flask_app, forecast_api
+from forecast_table import MAX_MONTHS_AHEAD
+from metrics import metrics
+from responses import accepts_gzip, encode, etag_matches
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one computation"""
+    def __init__(self, executor):
+        self.executor = executor
+        self.calls = 0
+        self.shared = 0
+        self._inflight = {}
+
+    async def run(self, key, fn, *args):
+        """Run fn(*args) in the executor, or join the call already running for key"""
+        self.calls += 1
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, fn, *args)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared += 1
+        # Shield so one cancelled client doesn't cancel the others' result
+        return await asyncio.shield(future)
+
+    def stats(self):
+        return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._inflight)}
+
+executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('FORECAST_PREDICT_THREADS', 4)),
+    thread_name_prefix='predict'
+)
+single_flight = SingleFlight(executor)
+flask_asgi = WsgiToAsgi(flask_app)
+
+def _collect_metrics():
+    stats = single_flight.stats()
+    return [
+        ('forecast_singleflight_calls_total', (), stats['calls']),
+        ('forecast_singleflight_shared_total', (), stats['shared']),
+        ('forecast_singleflight_in_flight', (), stats['in_flight'])
+    ]
+
+metrics.register_collector(_collect_metrics)
+
+def _model_version():
+    model_data = forecast_api.model_data
+    return model_data.get('timestamp') if model_data else None
+
+def _months_arg(query):
+    try:
+        months_ahead = int(query.get('months', ['6'])[0])
+    except ValueError:
+        months_ahead = 6
+    return months_ahead if 1 <= months_ahead <= MAX_MONTHS_AHEAD else 6
+
+def _series_arg(query):
+    series = query.get('series', [''])[0]
+    return list(dict.fromkeys(sid.strip() for sid in series.split(',') if sid.strip()))
+
+def _columnar_arg(query):
+    return query.get('format', [''])[0] == 'columnar'
+
+def _revalidate(etag_fn, query):
+    """Pick up a model saved by another process, then compute the request's ETag"""
+    forecast_api.refresh_model()
+    return etag_fn(query)
+
+def sales_etag(query):
+    series_ids = _series_arg(query)
+    if series_ids:
+        return forecast_api.forecast_etag('series', tuple(series_ids), _months_arg(query), _columnar_arg(query))
+    return forecast_api.forecast_etag('sales', _months_arg(query), _columnar_arg(query))
+
+def category_etag(query):
+    return forecast_api.forecast_etag('categories')
+
+async def sales_forecast(query):
+    """Async GET /api/forecast/sales"""
+    months_ahead = _months_arg(query)
+    columnar = _columnar_arg(query)
+    version = _model_version()
+
+    series_ids = _series_arg(query)
+    if series_ids:
+        try:
+            forecasts, missing = await single_flight.run(
+                ('series', tuple(series_ids), months_ahead, columnar, version),
+                forecast_api.predict_series, series_ids, months_ahead, columnar
+            )
+        except ValueError as e:
+            return 400, {'success': False, 'error': str(e)}
+        return 200, {
+            'success': True,
+            'series': forecasts,
+            'missing': missing,
+            'model_type': forecast_api.model_type or 'Fallback',
+            'generated_at': datetime.now().isoformat()
+        }
+
+    predictions = await single_flight.run(
+        ('sales', months_ahead, columnar, version), forecast_api.predict_sales, months_ahead, columnar
+    )
+    return 200, {
+        'success': True,
+        'forecast': predictions,
+        'model_type': forecast_api.model_type or 'Fallback',
+        'generated_at': datetime.now().isoformat()
+    }
+
+async def category_forecast(query):
+    """Async GET /api/forecast/categories"""
+    categories = await single_flight.run(('categories', _model_version()), forecast_api.predict_categories)
+    return 200, {
+        'success': True,
+        'categories': categories,
+        'generated_at': datetime.now().isoformat()
+    }
+
+# Path -> (handler, ETag function)
+ROUTES = {
+    '/api/forecast/sales': (sales_forecast, sales_etag),
+    '/api/forecast/categories': (category_forecast, category_etag)
+}
+
+async def _send(send, status, body=b'', gzipped=False, etag=None):
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+        (b'access-control-allow-origin', b'*'),
+        (b'vary', b'Accept-Encoding')
+    ]
+    if gzipped:
+        headers.append((b'content-encoding', b'gzip'))
+    if etag is not None:
+        headers.append((b'etag', f'"{etag}"'.encode()))
+        headers.append((b'cache-control', b'no-cache'))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+
+    route = ROUTES.get(scope.get('path')) if scope['type'] == 'http' else None
+    if route is None or scope['method'] != 'GET':
+        await flask_asgi(scope, receive, send)
+        return
+
+    start = time.perf_counter()
+    handler, etag_fn = route
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+    etag = None
+    loop = asyncio.get_running_loop()
+    try:
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        # Usually a stat, but reloading a replaced model or history file reads from disk
+        etag = await loop.run_in_executor(executor, _revalidate, etag_fn, query)
+        if etag_matches(headers.get('if-none-match'), etag):
+            status, body, gzipped = 304, b'', False
+        else:
+            gzip_ok = accepts_gzip(headers.get('accept-encoding'))
+            status = 200
+            encoded = forecast_api.responses.get((etag, gzip_ok)) if etag else None
+            if encoded is None:
+                status, payload = await handler(query)
+                encoded = await loop.run_in_executor(executor, encode, payload, gzip_ok)
+                if etag and status == 200:
+                    forecast_api.responses.put((etag, gzip_ok), encoded)
+            body, gzipped = encoded
+    except Exception as e:
+        status, (body, gzipped) = 500, encode({'success': False, 'error': str(e)})
+    await _send(send, status, body, gzipped, etag if status in (200, 304) else None)
+
+    if metrics.enabled:
+        labels = (('route', scope['path']), ('method', 'GET'))
+        metrics.observe('forecast_http_request_duration_seconds', time.perf_counter() - start, labels)
+        metrics.inc('forecast_http_requests_total', labels + (('status', status),))
@@ -1,95 +1,257 @@
 import pandas as pd
+from sklearn.base import BaseEstimator, RegressorMixin, clone
 from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-from joblib import dump
+from joblib import dump, load, Parallel, delayed
 import numpy as np
 from datetime import datetime
 import warnings
+import time
+import os
+from features import FEATURE_COLUMNS, build_horizon_features, month_labels
+from feature_cache import load_prepared_data
+from series_forecast import load_series_frame, train_series, update_series, predict_series
+from incremental import linear_stats, update_estimator
+from atomic_files import atomic_write, write_csv_atomic
+from compact_model import save_compact
+from intervals import interval_info
+from forecast_table import history_range, materialize
+from model_registry import ModelRegistry
 warnings.filterwarnings('ignore')
 
+class SeasonalNaiveRegressor(RegressorMixin, BaseEstimator):
+    """Predict the most recent sales seen for the same month of the year"""
+    def __init__(self, month_col=FEATURE_COLUMNS.index('Month_of_Year')):
+        self.month_col = month_col
+    
+    def fit(self, X, y):
+        months = np.asarray(X)[:, self.month_col].astype(np.int64)
+        y = np.asarray(y, dtype=np.float64)
+        
+        # Last occurrence of each month wins; unseen months use the overall mean
+        seen, last = np.unique(months[::-1], return_index=True)
+        self.month_sales_ = np.full(13, y.mean())
+        self.month_sales_[seen] = y[::-1][last]
+        return self
+    
+    def predict(self, X):
+        return self.month_sales_[np.asarray(X)[:, self.month_col].astype(np.int64)]
+
+# Candidate models evaluated by SalesForecastModel.train_models, keyed by display name.
+# Add an unfitted estimator here (or pass candidates=...) to include it in model selection.
+MODEL_CANDIDATES = {
+    'Linear Regression': LinearRegression(),
+    'Random Forest': RandomForestRegressor(n_estimators=100, random_state=42),
+    'Gradient Boosting': GradientBoostingRegressor(random_state=42),
+    'Seasonal Naive': SeasonalNaiveRegressor()
+}
+
+def register_candidate(name, estimator):
+    """Add an unfitted estimator to the default model candidates"""
+    MODEL_CANDIDATES[name] = estimator
+
+def _fit_and_score(name, estimator, X, y, train_idx, test_idx):
+    """Fit a fresh copy of estimator on one fold, returning its score and test errors"""
+    model = clone(estimator)
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - start
+    predictions = model.predict(X[test_idx])
+    mae = mean_absolute_error(y[test_idx], predictions)
+    return name, mae, fit_time, y[test_idx] - predictions
+
 class SalesForecastModel:
-    def __init__(self):
-        self.linear_model = LinearRegression()
-        self.rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
+    def __init__(self, candidates=None, n_splits=5, n_jobs=-1):
+        self.candidates = dict(candidates or MODEL_CANDIDATES)
+        self.n_splits = n_splits
+        self.n_jobs = n_jobs
         self.best_model = None
         self.model_type = None
+        self.best_mae = None
+        self.cv_report = []
+        self.series_bundle = None
+        self.linear_stats = None
+        self.interval = None
+        self.history_range = None
+        self.feature_columns = list(FEATURE_COLUMNS)
         
     def prepare_data(self, csv_file='sales_data.csv'):
         """Load and prepare sales data for training"""
         print("📊 Loading sales data...")
-        df = pd.read_csv(csv_file)
-        df['Month'] = pd.to_datetime(df['Month'])
-        
-        # Create features
-        df['Month_Num'] = df['Month'].dt.month + 12 * (df['Month'].dt.year - df['Month'].dt.year.min())
-        df['Month_of_Year'] = df['Month'].dt.month
-        df['Year'] = df['Month'].dt.year
-        df['Quarter'] = df['Month'].dt.quarter
-        
-        # Add seasonal features
-        df['Season'] = df['Month_of_Year'].map({
-            12: 'Winter', 1: 'Winter', 2: 'Winter',
-            3: 'Spring', 4: 'Spring', 5: 'Spring',
-            6: 'Summer', 7: 'Summer', 8: 'Summer',
-            9: 'Fall', 10: 'Fall', 11: 'Fall'
-        })
-        
-        # One-hot encode season
-        season_dummies = pd.get_dummies(df['Season'], prefix='Season')
-        df = pd.concat([df, season_dummies], axis=1)
+        
+        # Calendar and seasonal features come from the binary cache unless the CSV changed
+        df = load_prepared_data(csv_file)
         
         print(f"✅ Data loaded: {len(df)} records from {df['Month'].min().strftime('%Y-%m')} to {df['Month'].max().strftime('%Y-%m')}")
         return df
     
     def train_models(self, df):
-        """Train both Linear and Random Forest models"""
-        print("🧠 Training forecasting models...")
-        
-        # Features for training
-        feature_cols = ['Month_Num', 'Month_of_Year', 'Quarter'] + [col for col in df.columns if col.startswith('Season_')]
-        X = df[feature_cols]
-        y = df['Sales']
-        
-        # Train/Test split
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
-        
-        # Train Linear Regression
-        self.linear_model.fit(X_train, y_train)
-        linear_pred = self.linear_model.predict(X_test)
-        linear_mae = mean_absolute_error(y_test, linear_pred)
-        
-        # Train Random Forest
-        self.rf_model.fit(X_train, y_train)
-        rf_pred = self.rf_model.predict(X_test)
-        rf_mae = mean_absolute_error(y_test, rf_pred)
-        
-        # Select best model
-        if linear_mae < rf_mae:
-            self.best_model = self.linear_model
-            self.model_type = 'Linear Regression'
-            best_mae = linear_mae
+        """Select the best candidate model with time-series cross-validation
+        
+        Every candidate is fitted on expanding windows of past months and scored on
+        the months that follow, with all (candidate, fold) fits run in parallel.
+        The winner is then refitted on the full history.
+        """
+        print(f"🧠 Evaluating {len(self.candidates)} candidate models...")
+        
+        # Features for training, in the column order persisted with the model
+        X = df[self.feature_columns].to_numpy(dtype=np.float64)
+        y = df['Sales'].to_numpy(dtype=np.float64)
+        
+        # Rolling-origin folds: train on months before each test window only
+        splitter = TimeSeriesSplit(n_splits=min(self.n_splits, len(X) - 1))
+        folds = list(splitter.split(X))
+        
+        results = Parallel(n_jobs=self.n_jobs)(
+            delayed(_fit_and_score)(name, estimator, X, y, train_idx, test_idx)
+            for name, estimator in self.candidates.items()
+            for train_idx, test_idx in folds
+        )
+        
+        self.cv_report = []
+        for name in self.candidates:
+            maes = np.array([mae for n, mae, _, _ in results if n == name])
+            fit_times = np.array([fit_time for n, _, fit_time, _ in results if n == name])
+            self.cv_report.append({
+                'model': name,
+                'mae': float(maes.mean()),
+                'mae_std': float(maes.std()),
+                'fit_time': float(fit_times.sum()),
+                'folds': len(maes)
+            })
+            print(f"📈 {name:18} MAE: {maes.mean():8.2f} ± {maes.std():7.2f}  fit: {fit_times.sum():.3f}s")
+        
+        # Select best model and refit it on every month
+        best = min(self.cv_report, key=lambda row: row['mae'])
+        self.model_type = best['model']
+        self.best_mae = best['mae']
+        self.best_model = clone(self.candidates[self.model_type]).fit(X, y)
+        self.linear_stats = linear_stats(X, y) if isinstance(self.best_model, LinearRegression) else None
+        
+        # Prediction intervals from the forest's trees, the linear fit or the winner's CV errors
+        cv_residuals = np.concatenate([residuals for n, _, _, residuals in results if n == self.model_type])
+        self.interval = interval_info(self.best_model, X, y, cv_residuals, self.linear_stats)
+        self.history_range = history_range(df)
+        
+        print(f"🏆 Best Model: {self.model_type} (MAE: {self.best_mae:.2f}, {len(folds)} time-series folds)")
+        
+        return self.cv_report
+    
+    def load_artifact(self, model_data):
+        """Restore a trained model from saved model data so it can be updated"""
+        self.best_model = model_data['model']
+        self.model_type = model_data['model_type']
+        self.feature_columns = list(model_data.get('feature_columns', FEATURE_COLUMNS))
+        self.best_mae = model_data.get('mae')
+        self.cv_report = model_data.get('cv_report', [])
+        self.series_bundle = model_data.get('series')
+        self.linear_stats = model_data.get('linear_stats')
+        self.interval = model_data.get('interval')
+        table = model_data.get('materialized')
+        self.history_range = (table['last_month_index'], table['first_year']) if table is not None else None
+    
+    def update_models(self, df, new_rows):
+        """Refresh the trained model with appended months instead of retraining
+        
+        new_rows is a boolean mask over df marking the appended months. A month
+        before the first year shifts every row's Month_Num, so the model is then
+        refitted on the whole history instead.
+        """
+        print(f"🔄 Updating {self.model_type} with {int(np.sum(new_rows))} new months...")
+        start = time.perf_counter()
+        X = df[self.feature_columns].to_numpy(dtype=np.float64)
+        y = df['Sales'].to_numpy(dtype=np.float64)
+        # A month before the first year shifts every row's Month_Num axis
+        first_year_moved = self.history_range is not None and history_range(df)[1] != self.history_range[1]
+        if first_year_moved and not isinstance(self.best_model, LinearRegression):
+            print("↩️  History now starts in an earlier year; refitting on the whole history")
+            self.best_model, self.linear_stats = clone(self.best_model).fit(X, y), None
         else:
-            self.best_model = self.rf_model
-            self.model_type = 'Random Forest'
-            best_mae = rf_mae
+            # X'X saved on another axis (or with no recorded first year) is rebuilt from df
+            stats = None if first_year_moved or self.history_range is None else self.linear_stats
+            self.best_model, self.linear_stats = update_estimator(self.best_model, X, y, new_rows, stats)
+        # Residual intervals keep the cross-validated spread until the next full retrain
+        if self.interval is None or self.interval['method'] != 'residual':
+            self.interval = interval_info(self.best_model, X, y, stats=self.linear_stats)
+        self.history_range = history_range(df)
+        print(f"✅ Model updated in {time.perf_counter() - start:.3f}s")
+    
+    def update_series_models(self, df, series_ids):
+        """Refresh series models for the series that received new months"""
+        print(f"🔄 Updating series models for {len(series_ids)} series...")
+        self.series_bundle = update_series(self.series_bundle, df, series_ids, self.n_jobs)
+    
+    def prepare_series_data(self, csv_file='series_sales.csv'):
+        """Load long-format series_id,Month,Sales data for multi-series training"""
+        print("📊 Loading series sales data...")
+        df = load_series_frame(csv_file)
+        print(f"✅ Series data loaded: {len(df)} records across {df['series_id'].nunique()} series")
+        return df
+    
+    def train_series_models(self, df, strategy='global', estimator=None):
+        """Train forecasts for every store/category series in df
         
-        print(f"📈 Linear Regression MAE: {linear_mae:.2f}")
-        print(f"🌲 Random Forest MAE: {rf_mae:.2f}")
-        print(f"🏆 Best Model: {self.model_type} (MAE: {best_mae:.2f})")
+        'global' fits one pooled model on level-scaled sales; 'per_series' fits an
+        independent linear model per series in parallel.
+        """
+        print(f"🧠 Training {strategy} model for {df['series_id'].nunique()} series...")
+        start = time.perf_counter()
+        self.series_bundle = train_series(df, self.feature_columns, strategy, estimator, self.n_jobs)
+        print(f"✅ Series models trained in {time.perf_counter() - start:.2f}s")
+        return self.series_bundle
+    
+    def predict_series(self, series_ids, months_ahead=6):
+        """Forecast many series at once, returning {series_id: [predictions]}"""
+        found, missing, month_index, preds = predict_series(self.series_bundle, series_ids, months_ahead)
+        if missing:
+            print(f"⚠️  Unknown series: {', '.join(missing)}")
         
-        return X_train, X_test, y_train, y_test
+        labels = month_labels(month_index, '%Y-%m').tolist()
+        return {
+            sid: [
+                {'month': month, 'predicted_sales': sales}
+                for month, sales in zip(series_labels, series_preds)
+            ]
+            for sid, series_labels, series_preds in zip(found, labels, np.round(preds, 2).tolist())
+        }
     
-    def save_model(self, filename='sales_model.pkl'):
-        """Save the trained model"""
+    def save_model(self, filename='sales_model.pkl', version=None):
+        """Save the trained model
+        
+        The artifact is written to a temporary file and renamed into place, so
+        readers never see a partially written model. The serving arrays are also
+        written to a compact .npz next to it (see compact_model), both with the
+        forecasts materialized for the training history (see forecast_table).
+        version is the registry version the artifact is saved as, if any.
+        """
         model_data = {
             'model': self.best_model,
             'model_type': self.model_type,
+            'feature_columns': self.feature_columns,
+            'mae': self.best_mae,
+            'cv_report': self.cv_report,
+            'series': self.series_bundle,
+            'linear_stats': self.linear_stats,
+            'interval': self.interval,
+            'version': version,
             'timestamp': datetime.now().isoformat()
         }
-        dump(model_data, filename)
+        if self.history_range is not None:
+            # Precompute what the API serves for the history the model was fitted on
+            model_data['materialized'] = materialize(model_data, *self.history_range)
+        with atomic_write(filename) as tmp_filename:
+            dump(model_data, tmp_filename)
         print(f"✅ Model saved as {filename}")
+        
+        compact_file = os.path.splitext(filename)[0] + '.npz'
+        if save_compact(model_data, compact_file):
+            print(f"✅ Compact model saved as {compact_file}")
+        elif os.path.exists(compact_file):
+            # Don't leave a stale compact model for the API to prefer
+            os.remove(compact_file)
+        return model_data
     
     def predict_future(self, df, months_ahead=6):
         """Generate future predictions"""
@@ -100,59 +262,130 @@ class SalesForecastModel:
         last_month_num = last_row['Month_Num']
         last_date = last_row['Month']
         
-        predictions = []
-        feature_cols = ['Month_Num', 'Month_of_Year', 'Quarter'] + [col for col in df.columns if col.startswith('Season_')]
+        # Score the whole horizon in a single model call
+        dates, X, _ = build_horizon_features(last_date, last_month_num, months_ahead, self.feature_columns)
+        preds = self.best_model.predict(X)
         
-        for i in range(1, months_ahead + 1):
-            future_date = pd.to_datetime(last_date) + pd.DateOffset(months=i)
-            future_month_num = last_month_num + i
-            future_month_of_year = future_date.month
-            future_quarter = future_date.quarter
-            
-            # Create season features
-            season = {
-                12: 'Winter', 1: 'Winter', 2: 'Winter',
-                3: 'Spring', 4: 'Spring', 5: 'Spring',
-                6: 'Summer', 7: 'Summer', 8: 'Summer',
-                9: 'Fall', 10: 'Fall', 11: 'Fall'
-            }[future_month_of_year]
-            
-            # Create feature vector
-            features = [future_month_num, future_month_of_year, future_quarter]
-            for col in [col for col in df.columns if col.startswith('Season_')]:
-                season_name = col.replace('Season_', '')
-                features.append(1 if season_name == season else 0)
-            
-            # Make prediction
-            pred = self.best_model.predict([features])[0]
-            
+        predictions = []
+        for i, (date, pred) in enumerate(zip(dates, preds), start=1):
             predictions.append({
-                'month': future_date.strftime('%Y-%m'),
-                'date': future_date,
+                'month': date.strftime('%Y-%m'),
+                'date': date,
                 'predicted_sales': round(pred, 2),
                 'trend': 'Growing' if i <= 3 else 'Stable'
             })
             
-            print(f"📅 {future_date.strftime('%Y-%m')} — 💰 Predicted Sales: ${pred:,.2f}")
+            print(f"📅 {date.strftime('%Y-%m')} — 💰 Predicted Sales: ${pred:,.2f}")
         
         return predictions
 
+def train_model(csv_file='sales_data.csv', model_file='sales_model.pkl', series_file='series_sales.csv',
+                promote=True):
+    """Train, select and register a model from csv_file, returning the saved model data
+    
+    Store/category series in series_file are trained into the same artifact when
+    that file exists. The model is registered as a new version next to model_file
+    and, with promote, becomes the served model_file. Holds the registry lock, so
+    training and updates from any process never overlap.
+    """
+    registry = ModelRegistry(model_file=model_file)
+    with registry.lock():
+        start = time.perf_counter()
+        forecast_model = SalesForecastModel()
+        df = forecast_model.prepare_data(csv_file)
+        forecast_model.train_models(df)
+        if series_file and os.path.exists(series_file):
+            forecast_model.train_series_models(forecast_model.prepare_series_data(series_file))
+        else:
+            series_file = None
+        
+        version, model_data = registry.register(
+            forecast_model.save_model, csv_file, series_file, fit_seconds=time.perf_counter() - start
+        )
+        if promote:
+            registry.promote(version)
+        return model_data
+
+def _merge_observations(csv_file, observations, key_cols):
+    """Add or replace monthly rows in a CSV, returning how many existing rows were replaced"""
+    new = pd.DataFrame(observations)
+    new['Month'] = pd.to_datetime(new['Month']).dt.strftime('%Y-%m')
+    new['Sales'] = pd.to_numeric(new['Sales'])
+    
+    replaced = 0
+    if os.path.exists(csv_file):
+        existing = pd.read_csv(csv_file, dtype={'series_id': str} if 'series_id' in key_cols else None)
+        existing['Month'] = pd.to_datetime(existing['Month']).dt.strftime('%Y-%m')
+        keep = ~existing.set_index(key_cols).index.isin(new.set_index(key_cols).index)
+        replaced = int((~keep).sum())
+        new = pd.concat([existing[keep], new[existing.columns.intersection(new.columns)]], ignore_index=True)
+    write_csv_atomic(new.sort_values(key_cols, kind='stable'), csv_file)
+    return replaced
+
+def update_model(observations, csv_file='sales_data.csv', model_file='sales_model.pkl',
+                 series_observations=None, series_file='series_sales.csv'):
+    """Append new monthly observations and refresh the saved model incrementally
+    
+    observations is a list of {'Month': 'YYYY-MM', 'Sales': value}; series_observations
+    adds {'series_id', 'Month', 'Sales'} rows for the store/category series. Returns
+    the saved model data. Holds the registry lock like train_model.
+    """
+    registry = ModelRegistry(model_file=model_file)
+    with registry.lock():
+        start = time.perf_counter()
+        forecast_model = SalesForecastModel()
+        forecast_model.load_artifact(load(model_file))
+    
+        if observations:
+            if _merge_observations(csv_file, observations, ['Month']):
+                # The saved X'X still holds the replaced months; rebuild it from the other rows
+                forecast_model.linear_stats = None
+            df = forecast_model.prepare_data(csv_file)
+            new_months = pd.to_datetime([obs['Month'] for obs in observations])
+            forecast_model.update_models(df, df['Month'].isin(new_months).to_numpy())
+    
+        if series_observations:
+            _merge_observations(series_file, series_observations, ['series_id', 'Month'])
+            series_ids = sorted({str(obs['series_id']) for obs in series_observations})
+            series_df = forecast_model.prepare_series_data(series_file)
+            if forecast_model.series_bundle:
+                forecast_model.update_series_models(series_df, series_ids)
+            else:
+                forecast_model.train_series_models(series_df)
+    
+        version, model_data = registry.register(
+            forecast_model.save_model, csv_file, series_file if forecast_model.series_bundle else None,
+            fit_seconds=time.perf_counter() - start, kind='update', parent=registry.active_version()
+        )
+        registry.promote(version)
+        return model_data
+
 def main():
     """Main training function"""
     print("🚀 Starting Sales Forecast Model Training")
     print("=" * 50)
     
     # Initialize model
+    start = time.perf_counter()
     forecast_model = SalesForecastModel()
     
     # Load and prepare data
     df = forecast_model.prepare_data()
     
     # Train models
-    X_train, X_test, y_train, y_test = forecast_model.train_models(df)
+    forecast_model.train_models(df)
+    
+    # Train store/category series when long-format data is available
+    series_file = 'series_sales.csv' if os.path.exists('series_sales.csv') else None
+    if series_file:
+        forecast_model.train_series_models(forecast_model.prepare_series_data(series_file))
     
-    # Save the best model
-    forecast_model.save_model()
+    # Register the best model as a new version and serve it
+    registry = ModelRegistry()
+    version, _ = registry.register(
+        forecast_model.save_model, 'sales_data.csv', series_file, fit_seconds=time.perf_counter() - start
+    )
+    registry.promote(version)
     
     # Generate sample predictions
     predictions = forecast_model.predict_future(df, months_ahead=6)
@@ -0,0 +1,112 @@
+"""Forecasts materialized when a model is saved
+
+A sales forecast depends only on the model and on where the sales history ends
+(its last month and first year). Saving a model therefore precomputes the full
+24-month forecast with its bounds and trends, plus next month's category split,
+into a small table of arrays stored with it (model_data['materialized'] and the
+compact .npz). While the served history still ends at the same month the API
+answers /api/forecast/sales and /api/forecast/categories from that table;
+once months are appended without retraining it runs the model as before.
+"""
+import numpy as np
+
+from metrics import metrics
+from intervals import predict_interval
+from series_forecast import predict_series
+from features import (
+    CATEGORY_SHARES, FEATURE_COLUMNS, build_month_index_features, horizon_month_index,
+    month_labels, seasonal_factors, determine_trends
+)
+
+# Longest horizon served by /api/forecast/sales
+MAX_MONTHS_AHEAD = 24
+
+def history_range(df):
+    """(last_month_index, first_year) of a prepared monthly sales frame"""
+    return int(df['Year'].iloc[-1]) * 12 + int(df['Month_of_Year'].iloc[-1]) - 1, int(df['Year'].min())
+
+def forecast_table(model_data, last_month_index, first_year, months_ahead=MAX_MONTHS_AHEAD):
+    """Seasonally adjusted forecast for the months after last_month_index
+
+    Returns a dict of arrays: month_index, sales, lower and upper (NaN for models
+    saved without interval information) and trend.
+    """
+    feature_columns = model_data.get('feature_columns', FEATURE_COLUMNS)
+
+    # Score the whole horizon in a single model call
+    with metrics.stage('features'):
+        month_index = horizon_month_index(last_month_index, months_ahead)
+        X = build_month_index_features(month_index, first_year, feature_columns)
+    with metrics.stage('predict'):
+        base_preds, base_lower, base_upper = predict_interval(model_data, X)
+
+    with metrics.stage('postprocess'):
+        factors = seasonal_factors(month_index % 12 + 1)
+        adjusted_preds = base_preds * factors
+        if base_lower is None:
+            lower = upper = np.full(months_ahead, np.nan)
+        else:
+            lower = np.round(base_lower * factors, 2)
+            upper = np.round(base_upper * factors, 2)
+        return {
+            'month_index': month_index,
+            'sales': np.round(adjusted_preds, 2),
+            'lower': lower,
+            'upper': upper,
+            'trend': determine_trends(adjusted_preds, base_preds)
+        }
+
+def table_rows(table):
+    """API forecast rows for every month of a forecast table"""
+    lower = [None if np.isnan(value) else value for value in table['lower'].tolist()]
+    upper = [None if np.isnan(value) else value for value in table['upper'].tolist()]
+    return [
+        {
+            'month': month,
+            'predictedSales': sales,
+            'lowerBound': low,
+            'upperBound': high,
+            'actualSales': 0,
+            'trend': trend
+        }
+        for month, sales, low, high, trend in zip(
+            month_labels(table['month_index']).tolist(), table['sales'].tolist(),
+            lower, upper, table['trend'].tolist()
+        )
+    ]
+
+def table_columns(table):
+    """API forecast columns (?format=columnar) straight from a forecast table's arrays"""
+    return {
+        'month': month_labels(table['month_index']).tolist(),
+        'predictedSales': table['sales'].tolist(),
+        'lowerBound': [None if np.isnan(value) else value for value in table['lower'].tolist()],
+        'upperBound': [None if np.isnan(value) else value for value in table['upper'].tolist()],
+        'actualSales': [0] * len(table['sales']),
+        'trend': table['trend'].tolist()
+    }
+
+def category_forecast(model_data, next_month_sales):
+    """Next month's sales per category
+
+    Uses the per-category series models when the model was trained with them,
+    otherwise splits next_month_sales by the fixed category shares.
+    """
+    bundle = model_data.get('series')
+    if bundle and set(CATEGORY_SHARES).issubset(bundle['series_ids']):
+        found, _, month_index, base_preds = predict_series(bundle, list(CATEGORY_SHARES), 1)
+        sales = np.round(base_preds[:, 0] * seasonal_factors(month_index[:, 0] % 12 + 1), 2)
+        return dict(zip(found, sales.tolist()))
+    return {category: round(next_month_sales * share, 2) for category, share in CATEGORY_SHARES.items()}
+
+def materialize(model_data, last_month_index, first_year):
+    """Precompute every served forecast of a model for a history ending at last_month_index"""
+    table = forecast_table(model_data, last_month_index, first_year)
+    categories = category_forecast(model_data, float(table['sales'][0]))
+    table.update({
+        'last_month_index': int(last_month_index),
+        'first_year': int(first_year),
+        'category_names': np.array(list(categories), dtype=str),
+        'category_sales': np.array(list(categories.values()), dtype=np.float64)
+    })
+    return table
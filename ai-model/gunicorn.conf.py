@@ -0,0 +1,26 @@
+"""Gunicorn settings for serving forecast_api in production"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('FORECAST_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('FORECAST_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('FORECAST_THREADS', 4))
+worker_class = 'gthread'
+
+# Import wsgi (and load the model) once in the master, then fork the workers
+preload_app = True
+timeout = 60
+accesslog = '-'
+
+def pre_fork(server, worker):
+    # Move the preloaded objects out of the GC's reach so collections in the
+    # workers don't touch (and copy) the shared pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    server.log.info("Worker %s serving %s model", worker.pid, _model_type())
+
+def _model_type():
+    from forecast_api import forecast_api
+    return forecast_api.model_type or 'Fallback'
@@ -0,0 +1,83 @@
+import copy
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.linear_model import LinearRegression
+
+# Boosting updates may grow a model to this multiple of its configured stages
+# before it is refitted from scratch instead
+MAX_BOOSTING_GROWTH = 1.5
+
+def linear_stats(X, y):
+    """Sufficient statistics (X'X, X'y with an intercept column) for a linear fit"""
+    Xa = np.hstack([np.ones((len(X), 1)), X])
+    return {'xtx': Xa.T @ Xa, 'xty': Xa.T @ y, 'rows': len(X)}
+
+def _add_linear_rows(stats, X_new, y_new):
+    new = linear_stats(X_new, y_new)
+    return {
+        'xtx': stats['xtx'] + new['xtx'],
+        'xty': stats['xty'] + new['xty'],
+        'rows': stats['rows'] + new['rows']
+    }
+
+def update_estimator(model, X, y, new_rows, stats=None, refresh_fraction=0.1):
+    """Refresh a fitted model with newly appended rows without a full retrain
+
+    X and y hold the full updated history and new_rows is a boolean mask of the
+    appended rows. The served model is never modified; an updated copy is
+    returned together with the linear statistics to persist (or None).
+
+    - LinearRegression: X'X and X'y are updated with the new rows only and solved
+      again (minimum-norm least squares, as sklearn does)
+    - RandomForestRegressor: a refresh_fraction of new trees is grown on the full
+      history with warm_start and the same number of oldest trees is dropped
+    - GradientBoostingRegressor: extra boosting stages are fitted on the residuals,
+      a refresh_fraction of the configured n_estimators each time; once that would
+      exceed MAX_BOOSTING_GROWTH times n_estimators the model is refitted instead
+    - anything with partial_fit is updated on the new rows; other models are refitted
+    """
+    new_rows = np.asarray(new_rows, dtype=bool)
+
+    if isinstance(model, LinearRegression):
+        if stats is None:
+            stats = linear_stats(X[~new_rows], y[~new_rows])
+        stats = _add_linear_rows(stats, X[new_rows], y[new_rows])
+        beta = np.linalg.pinv(stats['xtx']) @ stats['xty']
+        updated = copy.deepcopy(model)
+        updated.intercept_ = float(beta[0])
+        updated.coef_ = beta[1:]
+        return updated, stats
+
+    if isinstance(model, RandomForestRegressor):
+        n_trees = len(model.estimators_)
+        n_new = max(1, int(round(n_trees * refresh_fraction)))
+        updated = copy.deepcopy(model)
+        # Vary the seed with the history length so each refresh grows different trees
+        base_seed = model.random_state if isinstance(model.random_state, int) else 0
+        seed = (base_seed + len(y)) % (2 ** 31)
+        updated.set_params(warm_start=True, n_estimators=n_trees + n_new, random_state=seed)
+        updated.fit(X, y)
+        updated.estimators_ = updated.estimators_[n_new:]
+        updated.set_params(warm_start=False, n_estimators=n_trees)
+        return updated, None
+
+    if isinstance(model, GradientBoostingRegressor):
+        n_stages = model.n_estimators
+        n_new = max(1, int(round(n_stages * refresh_fraction)))
+        if model.n_estimators_ + n_new > n_stages * MAX_BOOSTING_GROWTH:
+            return clone(model).fit(X, y), None
+        updated = copy.deepcopy(model)
+        updated.set_params(warm_start=True, n_estimators=model.n_estimators_ + n_new)
+        updated.fit(X, y)
+        # Keep the configured stage count so later updates and refits start from it
+        updated.set_params(warm_start=False, n_estimators=n_stages)
+        return updated, None
+
+    if hasattr(model, 'partial_fit'):
+        updated = copy.deepcopy(model)
+        updated.partial_fit(X[new_rows], y[new_rows])
+        return updated, None
+
+    return clone(model).fit(X, y), None
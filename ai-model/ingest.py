@@ -0,0 +1,123 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from atomic_files import write_csv_atomic
+from features import month_labels
+
+def aggregate_transactions(csv_file, date_col='Date', amount_col='Total', category_col=None,
+                           store_col=None, chunksize=500_000, date_format=None):
+    """Stream a raw POS transaction export and total sales per month
+
+    The file is read in chunks with pandas (memory mapped), so memory stays bounded
+    by the chunk size plus one running total per month and series. Returns
+    (monthly, series, stats): monthly is a Month,Sales frame, series is a
+    series_id,Month,Sales frame (None without category/store columns) and stats
+    holds row counts and throughput.
+    """
+    group_cols = [col for col in (store_col, category_col) if col]
+    usecols = [date_col, amount_col] + group_cols
+
+    monthly_totals = None
+    series_totals = None
+    rows = 0
+    skipped = 0
+    start = time.perf_counter()
+
+    reader = pd.read_csv(
+        csv_file, usecols=usecols, chunksize=chunksize, memory_map=True,
+        dtype={col: 'category' for col in group_cols}
+    )
+    for chunk in reader:
+        rows += len(chunk)
+        dates = pd.to_datetime(chunk[date_col], format=date_format, errors='coerce')
+        amounts = pd.to_numeric(chunk[amount_col], errors='coerce')
+        valid = dates.notna().to_numpy() & amounts.notna().to_numpy()
+        skipped += int((~valid).sum())
+
+        month_index = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()[valid].astype(np.int64)
+        amounts = amounts.to_numpy(dtype=np.float64)[valid]
+
+        chunk_monthly = pd.Series(amounts).groupby(month_index).sum()
+        monthly_totals = chunk_monthly if monthly_totals is None else monthly_totals.add(chunk_monthly, fill_value=0)
+
+        if group_cols:
+            keys = chunk.loc[valid, group_cols[0]].astype(str)
+            for col in group_cols[1:]:
+                keys = keys + '-' + chunk.loc[valid, col].astype(str)
+            chunk_series = pd.Series(amounts).groupby([keys.to_numpy(), month_index]).sum()
+            series_totals = chunk_series if series_totals is None else series_totals.add(chunk_series, fill_value=0)
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'rows': rows,
+        'skipped_rows': skipped,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed > 0 else float('inf')
+    }
+
+    if monthly_totals is None:
+        monthly_totals = pd.Series(dtype=np.float64)
+    monthly_totals = monthly_totals.sort_index()
+    monthly = pd.DataFrame({
+        'Month': month_labels(monthly_totals.index, '%Y-%m'),
+        'Sales': monthly_totals.round(2).to_numpy()
+    })
+
+    series = None
+    if series_totals is not None:
+        series_totals = series_totals.sort_index()
+        series = pd.DataFrame({
+            'series_id': series_totals.index.get_level_values(0),
+            'Month': month_labels(series_totals.index.get_level_values(1), '%Y-%m'),
+            'Sales': series_totals.round(2).to_numpy()
+        })
+
+    return monthly, series, stats
+
+def ingest(csv_file, output='sales_data.csv', series_output='series_sales.csv', **kwargs):
+    """Aggregate a transaction export and write the files prepare_data consumes"""
+    print(f"📥 Ingesting transactions from {csv_file}...")
+    monthly, series, stats = aggregate_transactions(csv_file, **kwargs)
+
+    write_csv_atomic(monthly, output)
+    print(f"✅ Wrote {len(monthly)} months to {output}")
+    if series is not None and series_output:
+        write_csv_atomic(series, series_output)
+        print(f"✅ Wrote {len(series)} rows for {series['series_id'].nunique()} series to {series_output}")
+
+    print(f"⚡ {stats['rows']:,} rows in {stats['seconds']:.2f}s ({stats['rows_per_sec']:,.0f} rows/sec), "
+          f"{stats['skipped_rows']:,} skipped")
+    return stats
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Aggregate raw POS transactions into monthly sales')
+    parser.add_argument('transactions', help='raw transaction export (CSV)')
+    parser.add_argument('--date-col', default='Date', help='transaction date column (default: Date)')
+    parser.add_argument('--amount-col', default='Total', help='sale amount column (default: Total)')
+    parser.add_argument('--category-col', help='product category column for per-category series')
+    parser.add_argument('--store-col', help='store column for per-store series')
+    parser.add_argument('--date-format', help='strftime format of the date column, speeds up parsing')
+    parser.add_argument('--chunksize', type=int, default=500_000, help='rows per chunk (default: 500000)')
+    parser.add_argument('--output', default='sales_data.csv', help='monthly totals file (default: sales_data.csv)')
+    parser.add_argument('--series-output', default='series_sales.csv',
+                        help='per-series totals file (default: series_sales.csv)')
+    args = parser.parse_args()
+
+    ingest(
+        args.transactions,
+        output=args.output,
+        series_output=args.series_output,
+        date_col=args.date_col,
+        amount_col=args.amount_col,
+        category_col=args.category_col,
+        store_col=args.store_col,
+        chunksize=args.chunksize,
+        date_format=args.date_format
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Prediction intervals for the sales forecast
+
+How the interval is computed depends on the selected model and is saved with it
+as model_data['interval']:
+- trees: quantiles of the individual tree predictions of a random forest
+- linear: least-squares prediction interval, sigma * sqrt(1 + x' (X'X)^-1 x)
+- residual: point forecast +/- z * standard deviation of the out-of-fold
+  cross-validation errors (any other model)
+
+predict_interval() returns the point forecast and both bounds from one pass over
+the feature matrix; serving needs NumPy only.
+"""
+from statistics import NormalDist
+
+import numpy as np
+
+# Central coverage of the returned intervals
+DEFAULT_LEVEL = 0.8
+
+def interval_info(model, X, y, cv_residuals=None, stats=None):
+    """Describe how to compute intervals for a model fitted on X, y
+
+    cv_residuals are out-of-fold errors from model selection; stats are the
+    linear_stats of a linear model (X'X with an intercept column).
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+
+    if isinstance(model, RandomForestRegressor):
+        return {'method': 'trees'}
+
+    if isinstance(model, LinearRegression):
+        residuals = y - model.predict(X)
+        dof = max(1, len(y) - X.shape[1] - 1)
+        if stats is None:
+            Xa = np.hstack([np.ones((len(X), 1)), X])
+            xtx = Xa.T @ Xa
+        else:
+            xtx = stats['xtx']
+        return {
+            'method': 'linear',
+            'sigma': float(np.sqrt(residuals @ residuals / dof)),
+            'xtx_inv': np.linalg.pinv(xtx)
+        }
+
+    if cv_residuals is None or len(cv_residuals) < 2:
+        cv_residuals = y - model.predict(X)
+    return {'method': 'residual', 'sigma': float(np.std(cv_residuals, ddof=1))}
+
+def _forest_tree_predictions(model, X):
+    """Per-tree predictions, shape (rows, trees), from a compact or sklearn forest"""
+    if hasattr(model, 'predict_trees'):
+        return model.predict_trees(X)
+    X = np.asarray(X, dtype=np.float32)
+    return np.stack([tree.predict(X) for tree in model.estimators_], axis=1)
+
+def predict_interval(model_data, X, level=DEFAULT_LEVEL):
+    """Point forecast with lower and upper bounds for every row of X
+
+    Returns (point, lower, upper). The bounds are None for models saved without
+    interval information.
+    """
+    model = model_data['model']
+    info = model_data.get('interval')
+    if info is None:
+        return model.predict(X), None, None
+
+    if info['method'] == 'trees':
+        tree_preds = _forest_tree_predictions(model, X)
+        lower, upper = np.quantile(tree_preds, [(1 - level) / 2, (1 + level) / 2], axis=1)
+        return tree_preds.mean(axis=1), lower, upper
+
+    point = model.predict(X)
+    z = NormalDist().inv_cdf((1 + level) / 2)
+    if info['method'] == 'linear':
+        Xa = np.hstack([np.ones((len(X), 1)), np.asarray(X, dtype=np.float64)])
+        leverage = np.einsum('ij,jk,ik->i', Xa, info['xtx_inv'], Xa)
+        half_width = z * info['sigma'] * np.sqrt(1 + np.maximum(leverage, 0))
+    else:
+        half_width = np.full(len(point), z * info['sigma'])
+    return point, point - half_width, point + half_width
@@ -0,0 +1,143 @@
+"""In-process metrics for the forecast API, rendered in the Prometheus text format
+
+Counters and latency histograms are recorded on the hot path; values that already
+exist elsewhere (cache counters, model version) are read by collectors only when
+/metrics is scraped. With FORECAST_METRICS=0 every recording call returns
+immediately and stage() hands back a shared no-op context manager.
+"""
+from bisect import bisect_left
+from contextlib import nullcontext
+import os
+import threading
+import time
+
+# Latency histogram upper bounds in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Type and help text for every metric name
+METRIC_HELP = {
+    'forecast_http_requests_total': ('counter', 'HTTP requests handled, by route, method and status'),
+    'forecast_http_request_duration_seconds': ('histogram', 'HTTP request latency, by route and method'),
+    'forecast_stage_duration_seconds': ('histogram', 'Time spent in each forecast stage'),
+    'forecast_model_loads_total': ('counter', 'Models loaded or swapped in'),
+    'forecast_model_info': ('gauge', 'Currently served model (always 1)'),
+    'forecast_fallback_predictions_total': ('counter', 'Forecasts answered by the fallback instead of the model'),
+    'forecast_cache_requests_total': ('counter', 'Forecast cache lookups, by result'),
+    'forecast_cache_entries': ('gauge', 'Forecasts currently cached'),
+    'forecast_materialized_hits_total': ('counter', 'Forecasts answered from the table materialized at training'),
+    'forecast_history_reloads_total': ('counter', 'Times the sales history was (re)loaded from disk'),
+    'forecast_singleflight_calls_total': ('counter', 'Async forecast calls, coalesced or not'),
+    'forecast_singleflight_shared_total': ('counter', 'Async forecast calls that joined an in-flight computation'),
+    'forecast_singleflight_in_flight': ('gauge', 'Async forecast computations currently running')
+}
+
+_NULL_STAGE = nullcontext()
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + pairs + '}'
+
+class _Stage:
+    """Context manager observing the time spent inside it"""
+    __slots__ = ('metrics', 'labels', 'start')
+
+    def __init__(self, metrics, labels):
+        self.metrics = metrics
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe('forecast_stage_duration_seconds', time.perf_counter() - self.start, self.labels)
+        return False
+
+class Metrics:
+    """Thread-safe counters and histograms keyed by metric name and labels"""
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels=(), value=1):
+        """Add value to a counter; labels is a tuple of (key, value) pairs"""
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=()):
+        """Record one observation in a histogram"""
+        if not self.enabled:
+            return
+        key = (name, labels)
+        bucket = bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][bucket] += 1
+            histogram[1] += seconds
+
+    def stage(self, stage):
+        """Time a block of code as one forecast stage
+
+            with metrics.stage('predict'):
+                preds = model.predict(X)
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, (('stage', stage),))
+
+    def register_collector(self, collector):
+        """Add a callable returning [(name, labels, value)] read at scrape time"""
+        self._collectors.append(collector)
+
+    def clear(self):
+        """Reset all recorded counters and histograms"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            samples = [(name, labels, value) for (name, labels), value in self._counters.items()]
+            histograms = [
+                (name, labels, list(counts), total)
+                for (name, labels), (counts, total) in self._histograms.items()
+            ]
+        for collector in self._collectors:
+            samples.extend(collector())
+
+        by_name = {}
+        for name, labels, value in samples:
+            by_name.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value}")
+        for name, labels, counts, total in histograms:
+            lines = by_name.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+        output = []
+        for name in sorted(by_name):
+            metric_type, help_text = METRIC_HELP.get(name, ('untyped', name))
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {metric_type}")
+            output.extend(by_name[name])
+        return '\n'.join(output) + '\n'
+
+metrics = Metrics(enabled=os.environ.get('FORECAST_METRICS', '1') != '0')
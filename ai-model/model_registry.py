@@ -0,0 +1,216 @@
+"""Local registry of versioned model artifacts
+
+    models/
+      v0001/model.pkl, model.npz, metadata.json
+      v0002/...
+      ACTIVE.json            {"version": "v0002", "previous": "v0001", ...}
+
+Every trained or updated model is registered as a new version with its metadata.
+Promoting a version copies its artifacts over the served sales_model.pkl / .npz
+(each file renamed into place atomically) and records it in ACTIVE.json, so API
+workers pick it up through their usual model file check. Promoting the previous
+version rolls back.
+
+models/.lock serializes registrations, promotions and the training and update
+runs that wrap them across every process sharing the directory (see lock()).
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+
+from atomic_files import copy_atomic, file_lock, write_json_atomic
+
+ARTIFACT_NAME = 'model.pkl'
+COMPACT_NAME = 'model.npz'
+METADATA_NAME = 'metadata.json'
+ACTIVE_NAME = 'ACTIVE.json'
+LOCK_NAME = '.lock'
+
+def data_fingerprint(csv_file):
+    """SHA-256, size and row count of a training data file, or None if missing"""
+    if not csv_file or not os.path.exists(csv_file):
+        return None
+    digest = hashlib.sha256()
+    rows = 0
+    with open(csv_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+            rows += chunk.count(b'\n')
+    return {
+        'file': os.path.basename(csv_file),
+        'sha256': digest.hexdigest(),
+        'size': os.path.getsize(csv_file),
+        'rows': max(0, rows - 1)
+    }
+
+class ModelRegistry:
+    """Versioned model artifacts with an atomically promoted active version"""
+    def __init__(self, model_file='sales_model.pkl', root=None, keep=20):
+        self.model_file = model_file
+        self.compact_file = os.path.splitext(model_file)[0] + '.npz'
+        self.root = root or os.path.join(os.path.dirname(model_file) or '.', 'models')
+        self.keep = keep
+
+    def lock(self):
+        """Exclusive lock on the registry, shared by every process and thread using it"""
+        os.makedirs(self.root, exist_ok=True)
+        return file_lock(os.path.join(self.root, LOCK_NAME))
+
+    def _version_dir(self, version):
+        return os.path.join(self.root, version)
+
+    def versions(self):
+        """Registered version names, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if name.startswith('v') and os.path.exists(os.path.join(self.root, name, METADATA_NAME))
+        )
+
+    def metadata(self, version):
+        """Metadata of one version; raises KeyError for unknown versions"""
+        try:
+            with open(os.path.join(self._version_dir(version), METADATA_NAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise KeyError(f"Unknown model version: {version}")
+
+    def list(self):
+        """Metadata of every version, oldest first, with the active one flagged"""
+        active = self.active_version()
+        return [dict(self.metadata(version), active=version == active) for version in self.versions()]
+
+    def active(self):
+        """Contents of ACTIVE.json, or None before the first promotion"""
+        try:
+            with open(os.path.join(self.root, ACTIVE_NAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def active_version(self):
+        active = self.active()
+        return active['version'] if active else None
+
+    def register(self, save_fn, data_file=None, series_file=None, fit_seconds=None, kind='train', parent=None):
+        """Save a new version and return (version, model_data)
+
+        save_fn(filename, version) writes the artifact (SalesForecastModel.save_model),
+        recording its version, and returns its model_data. Runs under the registry lock.
+        """
+        with self.lock():
+            existing = self.versions()
+            number = int(existing[-1][1:]) + 1 if existing else 1
+            version = f"v{number:04d}"
+            # A crashed registration can leave a directory without metadata behind
+            while os.path.exists(self._version_dir(version)):
+                number += 1
+                version = f"v{number:04d}"
+            os.makedirs(self._version_dir(version))
+
+            model_data = save_fn(os.path.join(self._version_dir(version), ARTIFACT_NAME), version)
+            interval = model_data.get('interval')
+            metadata = {
+                'version': version,
+                'kind': kind,
+                'parent': parent,
+                'model_type': model_data['model_type'],
+                'feature_columns': list(model_data['feature_columns']),
+                'mae': model_data.get('mae'),
+                'cv_report': model_data.get('cv_report', []),
+                'interval_method': interval['method'] if interval else None,
+                'series': len(model_data['series']['series_ids']) if model_data.get('series') else 0,
+                'fit_seconds': fit_seconds,
+                'data': data_fingerprint(data_file),
+                'series_data': data_fingerprint(series_file),
+                'compact': os.path.exists(os.path.join(self._version_dir(version), COMPACT_NAME)),
+                'timestamp': model_data.get('timestamp'),
+                'registered_at': datetime.now().isoformat()
+            }
+            # Metadata last: a version only counts as registered once it is complete
+            write_json_atomic(metadata, os.path.join(self._version_dir(version), METADATA_NAME))
+            print(f"🗂️  Registered model {version} ({metadata['model_type']})")
+            self.prune()
+            return version, model_data
+
+    def load(self, version, mmap_mode=None):
+        """Load a version's model_data, preferring its compact artifact"""
+        metadata = self.metadata(version)
+        version_dir = self._version_dir(version)
+        if metadata.get('compact'):
+            from compact_model import load_compact
+            model_data = load_compact(os.path.join(version_dir, COMPACT_NAME), mmap_mode=mmap_mode)
+        else:
+            from joblib import load
+            model_data = load(os.path.join(version_dir, ARTIFACT_NAME), mmap_mode=mmap_mode)
+        model_data['version'] = version
+        return model_data
+
+    def promote(self, version):
+        """Make version the served model and return the ACTIVE.json record"""
+        metadata = self.metadata(version)
+        version_dir = self._version_dir(version)
+        with self.lock():
+            current = self.active_version()
+            # The pickle first: workers watch the compact file when it exists
+            copy_atomic(os.path.join(version_dir, ARTIFACT_NAME), self.model_file)
+            if metadata.get('compact'):
+                copy_atomic(os.path.join(version_dir, COMPACT_NAME), self.compact_file)
+            elif os.path.exists(self.compact_file):
+                os.remove(self.compact_file)
+
+            active = {
+                'version': version,
+                'previous': current if current != version else (self.active() or {}).get('previous'),
+                'promoted_at': datetime.now().isoformat()
+            }
+            write_json_atomic(active, os.path.join(self.root, ACTIVE_NAME))
+        print(f"🚀 Promoted model {version}")
+        return active
+
+    def rollback(self):
+        """Promote the previously active version"""
+        with self.lock():
+            active = self.active()
+            if not active or not active.get('previous'):
+                raise ValueError('No previous model version to roll back to')
+            return self.promote(active['previous'])
+
+    def prune(self):
+        """Delete the oldest versions beyond keep, never the active or previous one"""
+        active = self.active() or {}
+        protected = {active.get('version'), active.get('previous')}
+        versions = self.versions()
+        for version in versions[:max(0, len(versions) - self.keep)]:
+            if version not in protected:
+                shutil.rmtree(self._version_dir(version), ignore_errors=True)
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Inspect and promote registered models')
+    parser.add_argument('--model-file', default='sales_model.pkl', help='served model file (default: sales_model.pkl)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='list registered versions')
+    promote_parser = commands.add_parser('promote', help='serve a registered version')
+    promote_parser.add_argument('version')
+    commands.add_parser('rollback', help='serve the previously active version again')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(model_file=args.model_file)
+    if args.command == 'list':
+        for metadata in registry.list():
+            marker = '*' if metadata['active'] else ' '
+            mae = f"{metadata['mae']:.2f}" if metadata['mae'] is not None else '-'
+            print(f"{marker} {metadata['version']}  {metadata['model_type']:18} MAE {mae:>10}  "
+                  f"{metadata['kind']:6} {metadata['registered_at']}")
+    elif args.command == 'promote':
+        registry.promote(args.version)
+    else:
+        registry.rollback()
+
+if __name__ == "__main__":
+    main()
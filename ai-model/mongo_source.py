@@ -0,0 +1,315 @@
+"""Monthly sales pulled straight from the POS MongoDB
+
+    python mongo_source.py export      # full pull into sales_data.csv / series_sales.csv
+    python mongo_source.py sync        # pull new sales and update the model
+
+The transactions collection is totalled per month by aggregation pipelines on the
+server, so only one row per month (and series) crosses the network. Transactions
+of the current month are left out until the month is over.
+
+Incremental syncs keep a watermark next to the CSV (sales_data.csv.watermark.json):
+the highest ObjectId seen and the last complete month synced. A sync re-totals the
+months that received new transactions since then - late ones included - plus the
+months completed in between, and feeds them to update_model.
+
+pymongo is only needed when a source is used; pass client=mongomock.MongoClient()
+to run against an in-memory stand-in. Configure the API's source with
+FORECAST_MONGO_URI (and FORECAST_MONGO_DB, FORECAST_MONGO_COLLECTION,
+FORECAST_MONGO_DATE_FIELD, FORECAST_MONGO_AMOUNT_FIELD,
+FORECAST_MONGO_CATEGORY_FIELD, FORECAST_MONGO_STORE_FIELD).
+"""
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from atomic_files import write_json_atomic
+from features import month_labels
+
+# One pooled client per connection string and process; clients are thread-safe
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def get_client(uri, max_pool_size=10):
+    """Shared pymongo client for uri, created on first use
+
+    Created lazily so each forked gunicorn worker opens its own connection pool.
+    """
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(uri)
+        if client is None:
+            try:
+                from pymongo import MongoClient
+            except ImportError:
+                raise ImportError('pymongo is required for the MongoDB data source: pip install pymongo')
+            client = _CLIENTS[uri] = MongoClient(uri, maxPoolSize=max_pool_size, appname='pos-ai-model')
+        return client
+
+def _month_start(month_index):
+    return datetime(int(month_index) // 12, int(month_index) % 12 + 1, 1)
+
+def _object_id(value):
+    try:
+        from bson import ObjectId
+    except ImportError:
+        from mongomock import ObjectId
+    return ObjectId(value)
+
+def watermark_file(csv_file):
+    return f"{csv_file}.watermark.json"
+
+def load_watermark(csv_file):
+    """Watermark of the last sync into csv_file, or None before the first one"""
+    try:
+        with open(watermark_file(csv_file)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_watermark(watermark, csv_file):
+    write_json_atomic(watermark, watermark_file(csv_file))
+
+class MongoSalesSource:
+    """Monthly and per-series sales totals from a MongoDB transactions collection"""
+    def __init__(self, uri='mongodb://localhost:27017', database='POSWebDB', collection='Sales',
+                 date_field='Date', amount_field='Total', category_field=None, store_field=None,
+                 client=None):
+        self.uri = uri
+        self.database = database
+        self.collection_name = collection
+        self.date_field = date_field
+        self.amount_field = amount_field
+        self.category_field = category_field
+        self.store_field = store_field
+        self._client = client
+
+    @classmethod
+    def from_env(cls):
+        """Source configured by the FORECAST_MONGO_* variables, or None without a URI"""
+        uri = os.environ.get('FORECAST_MONGO_URI')
+        if not uri:
+            return None
+        return cls(
+            uri=uri,
+            database=os.environ.get('FORECAST_MONGO_DB', 'POSWebDB'),
+            collection=os.environ.get('FORECAST_MONGO_COLLECTION', 'Sales'),
+            date_field=os.environ.get('FORECAST_MONGO_DATE_FIELD', 'Date'),
+            amount_field=os.environ.get('FORECAST_MONGO_AMOUNT_FIELD', 'Total'),
+            category_field=os.environ.get('FORECAST_MONGO_CATEGORY_FIELD') or None,
+            store_field=os.environ.get('FORECAST_MONGO_STORE_FIELD') or None
+        )
+
+    @property
+    def has_series(self):
+        return bool(self.category_field or self.store_field)
+
+    @property
+    def collection(self):
+        client = self._client if self._client is not None else get_client(self.uri)
+        return client[self.database][self.collection_name]
+
+    def _series_fields(self):
+        return [field for field in (self.store_field, self.category_field) if field]
+
+    def _totals_pipeline(self, start, end, series=False):
+        """Pipeline totalling the transactions dated in [start, end) per month"""
+        match = {self.date_field: {'$type': 'date', '$lt': end}}
+        if start is not None:
+            match[self.date_field]['$gte'] = start
+        key = {'year': {'$year': f"${self.date_field}"}, 'month': {'$month': f"${self.date_field}"}}
+        if series:
+            for field in self._series_fields():
+                match[field] = {'$ne': None}
+                key[field] = f"${field}"
+        return [
+            {'$match': match},
+            {'$group': {'_id': key, 'sales': {'$sum': f"${self.amount_field}"}}}
+        ]
+
+    def totals(self, start_month=None, end_month=None, series=False):
+        """Sales per month for month indexes in [start_month, end_month)
+
+        Returns (month_index, sales, series_ids); series_ids is None unless series.
+        end_month defaults to the current month, which is still incomplete.
+        """
+        if end_month is None:
+            end_month = self._current_month()
+        start = _month_start(start_month) if start_month is not None else None
+        groups = list(self.collection.aggregate(self._totals_pipeline(start, _month_start(end_month), series)))
+
+        month_index = np.array([g['_id']['year'] * 12 + g['_id']['month'] - 1 for g in groups], dtype=np.int64)
+        sales = np.round(np.array([g['sales'] for g in groups], dtype=np.float64), 2)
+        series_ids = None
+        if series:
+            series_ids = np.array(
+                ['-'.join(str(g['_id'][field]) for field in self._series_fields()) for g in groups], dtype=str
+            )
+            order = np.lexsort((month_index, series_ids))
+            return month_index[order], sales[order], series_ids[order]
+        order = np.argsort(month_index, kind='stable')
+        return month_index[order], sales[order], series_ids
+
+    def _observations(self, start_month, end_month, months=None):
+        """Observation dicts for update_model, restricted to months when given"""
+        month_index, sales, _ = self.totals(start_month, end_month)
+        keep = np.isin(month_index, list(months)) if months is not None else slice(None)
+        observations = [
+            {'Month': month, 'Sales': value}
+            for month, value in zip(month_labels(month_index[keep], '%Y-%m').tolist(), sales[keep].tolist())
+        ]
+        series_observations = []
+        if self.has_series:
+            month_index, sales, series_ids = self.totals(start_month, end_month, series=True)
+            keep = np.isin(month_index, list(months)) if months is not None else slice(None)
+            series_observations = [
+                {'series_id': sid, 'Month': month, 'Sales': value}
+                for sid, month, value in zip(
+                    series_ids[keep].tolist(), month_labels(month_index[keep], '%Y-%m').tolist(), sales[keep].tolist()
+                )
+            ]
+        return observations, series_observations
+
+    def _last_id(self):
+        doc = self.collection.find_one({}, projection={'_id': 1}, sort=[('_id', -1)])
+        return doc['_id'] if doc else None
+
+    def _current_month(self):
+        now = datetime.now()
+        return now.year * 12 + now.month - 1
+
+    def snapshot(self):
+        """Every complete month as (observations, series_observations, watermark)"""
+        last_id = self._last_id()
+        end_month = self._current_month()
+        observations, series_observations = self._observations(None, end_month)
+        return observations, series_observations, self._watermark(last_id, end_month)
+
+    def changes(self, watermark):
+        """Months changed since watermark as (observations, series_observations, watermark)
+
+        A month is re-totalled when a transaction was inserted into it after the
+        watermark or when it has been completed since.
+        """
+        # Read the new watermark first so transactions inserted meanwhile are picked up next time
+        last_id = self._last_id()
+        end_month = self._current_month()
+        through = watermark['through_month_index']
+
+        months = set(range(through + 1, end_month))
+        if watermark.get('last_id'):
+            pipeline = [
+                {'$match': {
+                    '_id': {'$gt': _object_id(watermark['last_id'])},
+                    self.date_field: {'$type': 'date', '$lt': _month_start(end_month)}
+                }},
+                {'$group': {'_id': {'year': {'$year': f"${self.date_field}"},
+                                    'month': {'$month': f"${self.date_field}"}}}}
+            ]
+            months.update(g['_id']['year'] * 12 + g['_id']['month'] - 1 for g in self.collection.aggregate(pipeline))
+
+        if not months:
+            return [], [], self._watermark(last_id, end_month)
+        observations, series_observations = self._observations(min(months), end_month, months)
+        return observations, series_observations, self._watermark(last_id, end_month)
+
+    def _watermark(self, last_id, end_month):
+        return {
+            'last_id': str(last_id) if last_id is not None else None,
+            'through_month': str(month_labels([end_month - 1], '%Y-%m')[0]),
+            'through_month_index': int(end_month - 1),
+            'synced_at': datetime.now().isoformat()
+        }
+
+    def export(self, csv_file='sales_data.csv', series_file='series_sales.csv'):
+        """Replace csv_file (and series_file) with every complete month in MongoDB
+
+        Returns the watermark without saving it: callers save it once the data is
+        in use, so a failed first training is retried by the next sync.
+        """
+        import pandas as pd
+        from atomic_files import write_csv_atomic
+
+        print(f"📥 Pulling monthly sales from MongoDB {self.database}.{self.collection_name}...")
+        observations, series_observations, watermark = self.snapshot()
+        write_csv_atomic(pd.DataFrame(observations, columns=['Month', 'Sales']), csv_file)
+        if self.has_series:
+            write_csv_atomic(pd.DataFrame(series_observations, columns=['series_id', 'Month', 'Sales']), series_file)
+        print(f"✅ Wrote {len(observations)} months to {csv_file} (through {watermark['through_month']})")
+        return watermark
+
+def sync_model(source=None, csv_file='sales_data.csv', model_file='sales_model.pkl',
+               series_file='series_sales.csv'):
+    """Bring csv_file and the model up to date with MongoDB
+
+    The first sync (or one without a trained model) exports everything and trains;
+    later ones update the model with the changed months only. Returns the saved
+    model data, or None when nothing changed. Holds the registry lock throughout,
+    so concurrent syncs never read the same watermark.
+    """
+    from forecast_model import train_model, update_model
+    from model_registry import ModelRegistry
+
+    with ModelRegistry(model_file=model_file).lock():
+        source = source or MongoSalesSource.from_env() or MongoSalesSource()
+        watermark = load_watermark(csv_file)
+        if watermark is None or not os.path.exists(model_file):
+            watermark = source.export(csv_file, series_file)
+            model_data = train_model(csv_file=csv_file, model_file=model_file,
+                                     series_file=series_file if source.has_series else None)
+            # As below, only once the model is saved
+            save_watermark(watermark, csv_file)
+            return model_data
+
+        observations, series_observations, watermark = source.changes(watermark)
+        if not observations and not series_observations:
+            save_watermark(watermark, csv_file)
+            print(f"✅ No new sales in MongoDB since {watermark['through_month']}")
+            return None
+
+        print(f"🔄 Syncing {len(observations)} changed months from MongoDB...")
+        model_data = update_model(observations, csv_file=csv_file, model_file=model_file,
+                                  series_observations=series_observations, series_file=series_file)
+        # Only advance the watermark once the data and model are saved
+        save_watermark(watermark, csv_file)
+        return model_data
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Pull monthly sales from the POS MongoDB')
+    parser.add_argument('command', choices=['export', 'sync'],
+                        help='export: rewrite the CSVs; sync: pull changes and update the model')
+    parser.add_argument('--uri', default=os.environ.get('FORECAST_MONGO_URI', 'mongodb://localhost:27017'),
+                        help='connection string (default: $FORECAST_MONGO_URI or localhost)')
+    parser.add_argument('--database', default=os.environ.get('FORECAST_MONGO_DB', 'POSWebDB'),
+                        help='database name (default: POSWebDB)')
+    parser.add_argument('--collection', default=os.environ.get('FORECAST_MONGO_COLLECTION', 'Sales'),
+                        help='transactions collection (default: Sales)')
+    parser.add_argument('--date-field', default='Date', help='transaction date field (default: Date)')
+    parser.add_argument('--amount-field', default='Total', help='sale amount field (default: Total)')
+    parser.add_argument('--category-field', help='product category field for per-category series')
+    parser.add_argument('--store-field', help='store field for per-store series')
+    parser.add_argument('--output', default='sales_data.csv', help='monthly totals file (default: sales_data.csv)')
+    parser.add_argument('--series-output', default='series_sales.csv',
+                        help='per-series totals file (default: series_sales.csv)')
+    parser.add_argument('--model-file', default='sales_model.pkl', help='model to update (default: sales_model.pkl)')
+    args = parser.parse_args()
+
+    source = MongoSalesSource(
+        uri=args.uri,
+        database=args.database,
+        collection=args.collection,
+        date_field=args.date_field,
+        amount_field=args.amount_field,
+        category_field=args.category_field,
+        store_field=args.store_field
+    )
+    if args.command == 'export':
+        save_watermark(source.export(args.output, args.series_output), args.output)
+    else:
+        sync_model(source, csv_file=args.output, model_file=args.model_file, series_file=args.series_output)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,46 @@
-import pandas as pd
+from contextlib import nullcontext, redirect_stdout
 from datetime import datetime, timedelta
-from joblib import load
 import numpy as np
+import argparse
+import csv
 import sys
 import json
+import os
+
+from compact_model import load_compact
+from intervals import DEFAULT_LEVEL, predict_interval
+from sales_history import SalesHistory
+from series_forecast import predict_series
+from features import (
+    CATEGORY_SHARES, FEATURE_COLUMNS, MONTH_SEASON, build_month_index_features, horizon_month_index,
+    month_labels, seasonal_factors, determine_trends
+)
+
+# Columns of the streamed batch output, shared by every row kind
+EXPORT_FIELDS = [
+    'kind', 'series_id', 'month', 'date', 'predicted_sales', 'lower_bound', 'upper_bound',
+    'trend', 'confidence', 'season'
+]
 
 class SalesPredictor:
-    def __init__(self, model_file='sales_model.pkl'):
-        """Initialize the predictor with a trained model"""
+    def __init__(self, model_file='sales_model.pkl', data_file='sales_data.csv'):
+        """Initialize the predictor with a trained model
+        
+        The compact .npz next to model_file is used when present, so predicting
+        needs NumPy only.
+        """
+        self.data_file = data_file
+        self._history = None
+        compact_file = os.path.splitext(model_file)[0] + '.npz'
         try:
-            self.model_data = load(model_file)
+            if os.path.exists(compact_file):
+                self.model_data = load_compact(compact_file)
+            else:
+                from joblib import load
+                self.model_data = load(model_file)
             self.model = self.model_data['model']
             self.model_type = self.model_data['model_type']
+            self.feature_columns = self.model_data.get('feature_columns', FEATURE_COLUMNS)
             print(f"✅ Loaded {self.model_type} model")
         except FileNotFoundError:
             print("❌ Model file not found. Please run forecast_model.py first to train the model.")
@@ -21,125 +50,209 @@ class SalesPredictor:
         """Generate sales predictions for specified months ahead"""
         print(f"🔮 Generating {months_ahead} months forecast using {self.model_type}...")
         
-        # Load reference data to get the last date
+        history = self._load_history()
+        if history is None:
+            return []
+        
+        # Score the whole horizon in a single model call
+        month_index = horizon_month_index(history.last_month_index, months_ahead)
+        month_of_year = month_index % 12 + 1
+        X = build_month_index_features(month_index, history.first_year, self.feature_columns)
         try:
-            df = pd.read_csv('sales_data.csv')
-            df['Month'] = pd.to_datetime(df['Month'])
-            df['Month_Num'] = df['Month'].dt.month + 12 * (df['Month'].dt.year - df['Month'].dt.year.min())
-        except FileNotFoundError:
-            print("❌ sales_data.csv not found.")
+            base_preds, base_lower, base_upper = predict_interval(self.model_data, X)
+        except Exception as e:
+            last_month = month_labels([history.last_month_index], '%Y-%m')[0]
+            print(f"❌ Error predicting {months_ahead} months from {last_month}: {e}")
             return []
         
-        # Get last month data
-        last_row = df.iloc[-1]
-        last_month_num = last_row['Month_Num']
-        last_date = last_row['Month']
+        # Apply business seasonality and classify trends for all months at once
+        factors = seasonal_factors(month_of_year)
+        adjusted_preds = base_preds * factors
+        trends = determine_trends(adjusted_preds, base_preds)
+        if base_lower is None:
+            lower = upper = [None] * months_ahead
+            confidences = self._calculate_confidence(np.arange(1, months_ahead + 1))
+        else:
+            lower = np.round(base_lower * factors, 2).tolist()
+            upper = np.round(base_upper * factors, 2).tolist()
+            # The bounds' coverage, not a per-month score
+            confidences = np.full(months_ahead, round(100 * DEFAULT_LEVEL))
         
         predictions = []
-        
-        for i in range(1, months_ahead + 1):
-            future_date = pd.to_datetime(last_date) + pd.DateOffset(months=i)
-            future_month_num = last_month_num + i
-            future_month_of_year = future_date.month
-            future_quarter = future_date.quarter
-            
-            # Create season features
-            season = {
-                12: 'Winter', 1: 'Winter', 2: 'Winter',
-                3: 'Spring', 4: 'Spring', 5: 'Spring',
-                6: 'Summer', 7: 'Summer', 8: 'Summer',
-                9: 'Fall', 10: 'Fall', 11: 'Fall'
-            }[future_month_of_year]
+        for month, date, adjusted_pred, low, high, trend, confidence, season in zip(
+            month_labels(month_index).tolist(), month_labels(month_index, '%Y-%m-%d').tolist(),
+            np.round(adjusted_preds, 2).tolist(), lower, upper, trends.tolist(), confidences.tolist(),
+            MONTH_SEASON[month_of_year - 1].tolist()
+        ):
+            prediction_data = {
+                'month': month,
+                'date': date,
+                'predicted_sales': adjusted_pred,
+                'lower_bound': low,
+                'upper_bound': high,
+                'actual_sales': 0,  # Will be filled in with real data
+                'trend': trend,
+                'confidence': confidence,
+                'season': season
+            }
             
-            # Create feature vector (must match training features)
-            features = [
-                future_month_num, 
-                future_month_of_year, 
-                future_quarter,
-                1 if season == 'Fall' else 0,    # Season_Fall
-                1 if season == 'Spring' else 0,  # Season_Spring
-                1 if season == 'Summer' else 0,  # Season_Summer
-                1 if season == 'Winter' else 0   # Season_Winter
-            ]
+            predictions.append(prediction_data)
             
-            # Make prediction
-            try:
-                pred = self.model.predict([features])[0]
-                
-                # Add some randomness and business logic
-                seasonal_factor = {
-                    'Winter': 1.2,  # Holiday season boost
-                    'Spring': 1.0,
-                    'Summer': 0.9,  # Slower season
-                    'Fall': 1.1     # Back to school/work
-                }[season]
-                
-                adjusted_pred = pred * seasonal_factor
-                
-                prediction_data = {
-                    'month': future_date.strftime('%b %Y'),
-                    'date': future_date.strftime('%Y-%m-%d'),
-                    'predicted_sales': round(adjusted_pred, 2),
-                    'actual_sales': 0,  # Will be filled in with real data
-                    'trend': self._determine_trend(i, adjusted_pred, pred),
-                    'confidence': self._calculate_confidence(i),
-                    'season': season
-                }
-                
-                predictions.append(prediction_data)
-                
-                if output_format == 'console':
-                    confidence_str = f"({prediction_data['confidence']}% confidence)"
-                    print(f"📅 {prediction_data['month']} — 💰 ${adjusted_pred:,.0f} {confidence_str} [{prediction_data['trend']}]")
-                
-            except Exception as e:
-                print(f"❌ Error predicting for {future_date.strftime('%Y-%m')}: {e}")
+            if output_format == 'console':
+                if low is None:
+                    confidence_str = f"({confidence}% confidence)"
+                else:
+                    confidence_str = f"({confidence}% interval ${low:,.0f} – ${high:,.0f})"
+                print(f"📅 {month} — 💰 ${adjusted_pred:,.0f} {confidence_str} [{trend}]")
         
         return predictions
     
-    def _determine_trend(self, month_index, current_pred, base_pred):
-        """Determine if trend is growing, stable, or declining"""
-        if month_index <= 2:
-            return "Growing"
-        elif current_pred > base_pred * 1.05:
-            return "Growing"
-        elif current_pred < base_pred * 0.95:
-            return "Declining"
-        else:
-            return "Stable"
+    def _load_history(self):
+        """Sales history from data_file, read once per predictor"""
+        if self._history is None:
+            try:
+                self._history = SalesHistory.from_csv(self.data_file)
+            except FileNotFoundError:
+                print(f"❌ {self.data_file} not found.")
+        return self._history
     
     def _calculate_confidence(self, month_index):
-        """Calculate confidence level (decreases with time)"""
+        """Fixed confidence decay for models saved without prediction intervals"""
         base_confidence = 85
         decay_rate = 5
-        return max(60, base_confidence - (decay_rate * (month_index - 1)))
+        return np.maximum(60, base_confidence - (decay_rate * (np.asarray(month_index) - 1)))
     
-    def predict_category_sales(self):
-        """Predict category-wise sales (simulated for demo)"""
-        base_predictions = self.predict_sales(months_ahead=1, output_format='silent')
+    def predict_category_sales(self, predictions=None):
+        """Predict category-wise sales (simulated for demo)
+        
+        Splits next month's forecast; pass predictions from predict_sales to reuse
+        them instead of forecasting again.
+        """
+        base_predictions = predictions or self.predict_sales(months_ahead=1, output_format='silent')
         if not base_predictions:
             return {}
         
         total_prediction = base_predictions[0]['predicted_sales']
         
-        # Category distribution (based on typical clothing store data)
-        category_distribution = {
-            'Men': 0.35,
-            'Women': 0.42,
-            'Unisex': 0.18,
-            'Accessories': 0.05
-        }
-        
         category_forecast = {}
-        for category, percentage in category_distribution.items():
+        for category, percentage in CATEGORY_SHARES.items():
             category_forecast[category] = round(total_prediction * percentage, 2)
         
         return category_forecast
     
+    def iter_series_predictions(self, series_ids=None, months_ahead=6, chunk_size=10000):
+        """Yield (series_id, predictions) for every store/category series
+        
+        series_ids defaults to every series the model was trained on. Series are
+        forecast chunk_size at a time in one model call each, so memory stays
+        bounded however many series are exported. Raises ValueError for models
+        trained without series.
+        """
+        bundle = self._series_bundle()
+        if series_ids is None:
+            series_ids = bundle['series_ids'].tolist()
+        
+        steps = np.arange(1, months_ahead + 1)
+        confidences = self._calculate_confidence(steps).tolist()
+        missing = []
+        for chunk_start in range(0, len(series_ids), chunk_size):
+            found, chunk_missing, month_index, base_preds = predict_series(
+                bundle, series_ids[chunk_start:chunk_start + chunk_size], months_ahead
+            )
+            missing += chunk_missing
+            
+            flat_month_index = month_index.ravel()
+            flat_base = base_preds.ravel()
+            adjusted_preds = flat_base * seasonal_factors(flat_month_index % 12 + 1)
+            trends = determine_trends(adjusted_preds, flat_base, np.tile(steps, len(found)))
+            rows = list(zip(
+                month_labels(flat_month_index).tolist(), month_labels(flat_month_index, '%Y-%m-%d').tolist(),
+                np.round(adjusted_preds, 2).tolist(), trends.tolist(),
+                MONTH_SEASON[flat_month_index % 12].tolist()
+            ))
+            for i, sid in enumerate(found):
+                yield sid, [
+                    {
+                        'month': month,
+                        'date': date,
+                        'predicted_sales': sales,
+                        'lower_bound': None,
+                        'upper_bound': None,
+                        'actual_sales': 0,
+                        'trend': trend,
+                        'confidence': confidence,
+                        'season': season
+                    }
+                    for (month, date, sales, trend, season), confidence in zip(
+                        rows[i * months_ahead:(i + 1) * months_ahead], confidences
+                    )
+                ]
+        if missing:
+            print(f"⚠️  {len(missing)} series not in the model: {', '.join(missing[:10])}")
+    
+    def _series_bundle(self):
+        """The trained series models; raises ValueError for models trained without series"""
+        bundle = self.model_data.get('series')
+        if not bundle:
+            raise ValueError('No series models trained. Add series_sales.csv and retrain.')
+        return bundle
+    
+    def iter_export_rows(self, months_ahead=6, series_ids=None, include_total=True, include_categories=True):
+        """Yield flat EXPORT_FIELDS rows for streaming, computing each forecast once
+        
+        series_ids selects store/category series (an empty list for all of them,
+        None for none).
+        """
+        if include_total or include_categories:
+            predictions = self.predict_sales(months_ahead=months_ahead, output_format='silent')
+            if include_total:
+                for prediction in predictions:
+                    yield self._export_row(prediction, 'total', '')
+            if include_categories and predictions:
+                first = predictions[0]
+                for category, amount in self.predict_category_sales(predictions).items():
+                    yield {
+                        'kind': 'category', 'series_id': category, 'month': first['month'],
+                        'date': first['date'], 'predicted_sales': amount, 'lower_bound': None,
+                        'upper_bound': None, 'trend': None, 'confidence': None, 'season': first['season']
+                    }
+        
+        if series_ids is not None:
+            for sid, predictions in self.iter_series_predictions(series_ids or None, months_ahead):
+                for prediction in predictions:
+                    yield self._export_row(prediction, 'series', sid)
+    
+    def _export_row(self, prediction, kind, series_id):
+        row = {'kind': kind, 'series_id': series_id}
+        row.update((field, prediction[field]) for field in EXPORT_FIELDS[2:])
+        return row
+    
+    def stream_export(self, out, output_format='ndjson', **kwargs):
+        """Write iter_export_rows to a text stream as NDJSON or CSV, row by row
+        
+        Returns the number of rows written. Raises ValueError before writing
+        anything when series are requested from a model trained without them.
+        """
+        if kwargs.get('series_ids') is not None:
+            self._series_bundle()
+        rows = 0
+        if output_format == 'csv':
+            writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS)
+            writer.writeheader()
+            for row in self.iter_export_rows(**kwargs):
+                writer.writerow(row)
+                rows += 1
+        else:
+            for row in self.iter_export_rows(**kwargs):
+                out.write(json.dumps(row, separators=(',', ':')))
+                out.write('\n')
+                rows += 1
+        return rows
+    
     def export_to_json(self, filename='forecast_results.json', months_ahead=6):
         """Export predictions to JSON file"""
         predictions = self.predict_sales(months_ahead=months_ahead, output_format='silent')
-        category_forecast = self.predict_category_sales()
+        category_forecast = self.predict_category_sales(predictions)
         
         export_data = {
             'forecast_date': datetime.now().isoformat(),
@@ -159,8 +272,60 @@ class SalesPredictor:
         print(f"📄 Forecast exported to {filename}")
         return export_data
 
+def batch_main(argv):
+    """Non-interactive forecast export, streamed as NDJSON or CSV"""
+    parser = argparse.ArgumentParser(description='Export sales forecasts without prompts')
+    parser.add_argument('--months', type=int, default=6, help='months to forecast, 1-24 (default: 6)')
+    parser.add_argument('--series', help="comma-separated series ids, or 'all' for every trained series")
+    parser.add_argument('--no-total', action='store_true', help='leave out the total sales forecast')
+    parser.add_argument('--no-categories', action='store_true', help='leave out the category split')
+    parser.add_argument('--format', choices=['ndjson', 'csv', 'json'], default='ndjson',
+                        help='ndjson or csv stream one row per forecast month; json writes the summary '
+                             'document of the interactive export (default: ndjson)')
+    parser.add_argument('--output', default='-', help="output file, '-' for stdout (default: -)")
+    parser.add_argument('--model-file', default='sales_model.pkl', help='model (default: sales_model.pkl)')
+    parser.add_argument('--data-file', default='sales_data.csv', help='sales history (default: sales_data.csv)')
+    args = parser.parse_args(argv)
+    if not 1 <= args.months <= 24:
+        parser.error('--months must be between 1 and 24')
+    
+    to_stdout = args.output == '-'
+    stdout = sys.stdout
+    # Keep progress messages out of a forecast streamed to stdout
+    with redirect_stdout(sys.stderr) if to_stdout else nullcontext():
+        predictor = SalesPredictor(model_file=args.model_file, data_file=args.data_file)
+        if args.format == 'json':
+            if to_stdout:
+                parser.error('--format json needs an --output file')
+            predictor.export_to_json(args.output, months_ahead=args.months)
+            return
+        
+        series_ids = None
+        if args.series:
+            series_ids = [] if args.series == 'all' else [sid.strip() for sid in args.series.split(',') if sid.strip()]
+            # Fail before the output file is created or anything is streamed
+            try:
+                predictor._series_bundle()
+            except ValueError as e:
+                print(f"❌ {e}")
+                sys.exit(2)
+        out = stdout if to_stdout else open(args.output, 'w', newline='')
+        try:
+            rows = predictor.stream_export(
+                out, args.format, months_ahead=args.months, series_ids=series_ids,
+                include_total=not args.no_total, include_categories=not args.no_categories
+            )
+        finally:
+            if not to_stdout:
+                out.close()
+        print(f"📄 Wrote {rows} forecast rows to {'stdout' if to_stdout else args.output}")
+
 def main():
     """Main prediction function"""
+    if len(sys.argv) > 1:
+        batch_main(sys.argv[1:])
+        return
+    
     print("🔮 Sales Forecasting System")
     print("=" * 40)
     
@@ -185,7 +350,7 @@ def main():
         # Show category forecast
         print(f"\n🏷️  Category Forecast (Next Month):")
         print("-" * 30)
-        category_forecast = predictor.predict_category_sales()
+        category_forecast = predictor.predict_category_sales(predictions)
         for category, amount in category_forecast.items():
             print(f"{category:12}: ${amount:,.2f}")
         
@@ -0,0 +1,79 @@
+"""Encoding of forecast responses shared by the Flask and ASGI apps
+
+- dumps() uses orjson when it is installed, the standard json module otherwise
+- ?format=columnar forecasts are built as parallel arrays from the forecast
+  arrays (forecast_table.table_columns); to_columns() converts the few row-built
+  responses such as fallbacks
+- forecast_etag() names a forecast by the model, the sales history and the request
+  parameters, so an unchanged forecast is revalidated with 304 Not Modified without
+  computing or encoding anything
+- encode() gzips bodies larger than GZIP_MIN_BYTES for clients that accept it
+"""
+import gzip
+import hashlib
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Smaller bodies are sent uncompressed: gzip would barely shrink them
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+def dumps(payload):
+    """Serialize payload to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+def to_columns(rows):
+    """Forecast rows as one array per field: {'month': [...], 'predictedSales': [...]}"""
+    if not rows:
+        return {}
+    return {key: [row[key] for row in rows] for key in rows[0]}
+
+def first_months(forecast, months_ahead):
+    """The first months_ahead months of a forecast in row or columnar form"""
+    if isinstance(forecast, dict):
+        return {key: values[:months_ahead] for key, values in forecast.items()}
+    return forecast[:months_ahead]
+
+def forecast_etag(model_data, history, *parts):
+    """Entity tag of a model forecast, or None for fallback forecasts
+
+    parts are the request parameters that change the body (route, months, ids,
+    format). Fallback forecasts depend on the current date, so they get none.
+    """
+    if not model_data or history is None:
+        return None
+    key = repr((model_data.get('timestamp'), model_data.get('version'), history.fingerprint) + parts)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value names etag (or is *)"""
+    if not if_none_match or etag is None:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate.strip('"') == etag:
+            return True
+    return False
+
+def accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header value allows gzip"""
+    for coding in (accept_encoding or '').split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+def encode(payload, gzip_ok=False):
+    """(body, gzipped) for a payload, gzipped when allowed and worth it"""
+    body = dumps(payload)
+    if gzip_ok and len(body) >= GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), True
+    return body, False
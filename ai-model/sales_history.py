@@ -0,0 +1,89 @@
+import os
+import threading
+
+import numpy as np
+
+from feature_cache import load_prepared_records
+from features import EPOCH_MONTH_INDEX
+
+class SalesHistory:
+    """Compact, read-only monthly sales history
+
+    month_index holds year * 12 + (month - 1) as int32 and sales the matching
+    totals as float64, in month order.
+    """
+    def __init__(self, month_index, sales, fingerprint=None):
+        self.month_index = np.asarray(month_index, dtype=np.int32)
+        self.sales = np.asarray(sales, dtype=np.float64)
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def from_csv(cls, csv_file='sales_data.csv', fingerprint=None):
+        """Load a Month,Sales CSV into a history, via the prepared-data cache"""
+        records = load_prepared_records(csv_file)
+        month_index = records['Year'].astype(np.int64) * 12 + records['Month_of_Year'] - 1
+        return cls(month_index, records['Sales'], fingerprint)
+
+    def __len__(self):
+        return len(self.month_index)
+
+    @property
+    def first_year(self):
+        return int(self.month_index.min()) // 12
+
+    @property
+    def dates(self):
+        """Month start dates as a DatetimeIndex"""
+        import pandas as pd
+        months = (self.month_index.astype(np.int64) - EPOCH_MONTH_INDEX).astype('datetime64[M]')
+        return pd.DatetimeIndex(months.astype('datetime64[ns]'))
+
+    @property
+    def month_num(self):
+        """Month_Num training feature for every row"""
+        return self.month_index.astype(np.int64) - self.first_year * 12 + 1
+
+    @property
+    def last_month_index(self):
+        return int(self.month_index[-1])
+
+    @property
+    def last_date(self):
+        import pandas as pd
+        return pd.Timestamp(np.datetime64(self.last_month_index - EPOCH_MONTH_INDEX, 'M'))
+
+    @property
+    def last_month_num(self):
+        return int(self.month_index[-1]) - self.first_year * 12 + 1
+
+class HistoryLoader:
+    """Keep a SalesHistory resident and reload it only when the file changes"""
+    def __init__(self, csv_file='sales_data.csv'):
+        self.csv_file = csv_file
+        self.reloads = 0
+        self._history = None
+        self._lock = threading.Lock()
+
+    def fingerprint(self):
+        """Identify the current file contents by modification time and size"""
+        try:
+            stat = os.stat(self.csv_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def get(self):
+        """Return the current history, or None when the file is missing"""
+        fingerprint = self.fingerprint()
+        history = self._history
+        if fingerprint is None:
+            return None
+        if history is not None and history.fingerprint == fingerprint:
+            return history
+
+        with self._lock:
+            if self._history is None or self._history.fingerprint != fingerprint:
+                self._history = SalesHistory.from_csv(self.csv_file, fingerprint)
+                self.reloads += 1
+                print(f"📊 Loaded {len(self._history)} months of sales history from {self.csv_file}")
+            return self._history
@@ -0,0 +1,140 @@
+import numpy as np
+
+from features import FEATURE_COLUMNS, add_calendar_features, build_month_index_features
+
+# pandas, joblib and sklearn are imported by the training functions only;
+# predict_series needs NumPy alone
+
+def load_series_frame(csv_file='series_sales.csv'):
+    """Load long-format series_id,Month,Sales data with calendar features
+
+    Month_Num is counted from the first year across all series so every series
+    shares one time axis.
+    """
+    import pandas as pd
+    df = pd.read_csv(csv_file, usecols=['series_id', 'Month', 'Sales'], dtype={'series_id': str})
+    df['Month'] = pd.to_datetime(df['Month'])
+    df = df.sort_values(['series_id', 'Month'], kind='stable').reset_index(drop=True)
+    return add_calendar_features(df)
+
+def _fit_linear_chunk(X, y, bounds):
+    """Fit one linear model per series for a contiguous block of series"""
+    from sklearn.linear_model import LinearRegression
+    coef = np.empty((len(bounds), X.shape[1]))
+    intercept = np.empty(len(bounds))
+    for i, (start, stop) in enumerate(bounds):
+        model = LinearRegression().fit(X[start:stop], y[start:stop])
+        coef[i] = model.coef_
+        intercept[i] = model.intercept_
+    return coef, intercept
+
+def train_series(df, feature_columns=None, strategy='global', estimator=None, n_jobs=-1):
+    """Train forecasts for every series in a long-format frame
+
+    strategy='global' fits one estimator on all series, each scaled by its mean
+    sales level. strategy='per_series' fits an independent linear model per series,
+    in parallel blocks, and keeps their coefficients as stacked arrays.
+    Returns a plain dict bundle that is saved inside the model artifact.
+    """
+    import pandas as pd
+    from joblib import Parallel, delayed
+    from sklearn.base import clone
+    from sklearn.linear_model import LinearRegression
+
+    if feature_columns is None:
+        feature_columns = FEATURE_COLUMNS
+
+    X = df[feature_columns].to_numpy(dtype=np.float64)
+    y = df['Sales'].to_numpy(dtype=np.float64)
+    series_ids, starts, counts = np.unique(df['series_id'].to_numpy(), return_index=True, return_counts=True)
+    stops = starts + counts
+
+    months = pd.DatetimeIndex(df['Month'])
+    month_index = (months.year.to_numpy() * 12 + months.month.to_numpy() - 1).astype(np.int32)
+
+    bundle = {
+        'strategy': strategy,
+        'series_ids': series_ids.astype(str),
+        'last_month_index': month_index[stops - 1],
+        'first_year': int(months.year.min()),
+        'feature_columns': list(feature_columns)
+    }
+
+    if strategy == 'global':
+        levels = np.add.reduceat(y, starts) / counts
+        levels[levels == 0] = 1.0
+        row_levels = np.repeat(levels, counts)
+        bundle['levels'] = levels
+        bundle['model'] = clone(estimator if estimator is not None else LinearRegression()).fit(X, y / row_levels)
+    elif strategy == 'per_series':
+        bounds = list(zip(starts, stops))
+        chunk_size = max(1, -(-len(bounds) // 64))
+        chunks = [bounds[i:i + chunk_size] for i in range(0, len(bounds), chunk_size)]
+        results = Parallel(n_jobs=n_jobs if len(chunks) > 1 else 1)(delayed(_fit_linear_chunk)(X, y, chunk) for chunk in chunks)
+        bundle['coef'] = np.vstack([coef for coef, _ in results])
+        bundle['intercept'] = np.concatenate([intercept for _, intercept in results])
+    else:
+        raise ValueError(f"Unknown series strategy: {strategy}")
+
+    return bundle
+
+def update_series(bundle, df, series_ids, n_jobs=-1):
+    """Refresh a trained bundle after new observations for series_ids were appended
+
+    With per_series models only the affected series are refitted (new series are
+    added); the global model pools every series, so it is refitted as a whole.
+    A month before the bundle's first year shifts every series' Month_Num, so
+    then all series are refitted.
+    """
+    import pandas as pd
+    if bundle['strategy'] == 'global':
+        return train_series(df, bundle['feature_columns'], 'global', bundle['model'], n_jobs)
+    if int(pd.DatetimeIndex(df['Month']).year.min()) != bundle['first_year']:
+        return train_series(df, bundle['feature_columns'], 'per_series', n_jobs=n_jobs)
+
+    affected = df[df['series_id'].isin(series_ids)]
+    partial = train_series(affected, bundle['feature_columns'], 'per_series', n_jobs=n_jobs)
+
+    updated = dict(bundle)
+    ids = list(bundle['series_ids'])
+    positions = pd.Index(ids).get_indexer(partial['series_ids'])
+    coef = bundle['coef'].copy()
+    intercept = bundle['intercept'].copy()
+    last_month_index = bundle['last_month_index'].copy()
+
+    known = positions >= 0
+    coef[positions[known]] = partial['coef'][known]
+    intercept[positions[known]] = partial['intercept'][known]
+    last_month_index[positions[known]] = partial['last_month_index'][known]
+
+    updated['series_ids'] = np.concatenate([bundle['series_ids'], partial['series_ids'][~known]])
+    updated['coef'] = np.vstack([coef, partial['coef'][~known]])
+    updated['intercept'] = np.concatenate([intercept, partial['intercept'][~known]])
+    updated['last_month_index'] = np.concatenate([last_month_index, partial['last_month_index'][~known]])
+    return updated
+
+def predict_series(bundle, series_ids, months_ahead=6):
+    """Forecast many series in one batched pass
+
+    Returns (found_ids, missing_ids, month_index, preds) where month_index holds
+    year * 12 + (month - 1) and both arrays have shape (len(found_ids), months_ahead).
+    """
+    index = {sid: i for i, sid in enumerate(bundle['series_ids'].tolist())}
+    positions = np.array([index.get(sid, -1) for sid in series_ids], dtype=np.int64)
+    found = positions >= 0
+    missing = [sid for sid, ok in zip(series_ids, found) if not ok]
+    positions = positions[found]
+
+    steps = np.tile(np.arange(1, months_ahead + 1), len(positions))
+    rows = np.repeat(positions, months_ahead)
+    month_index = bundle['last_month_index'][rows].astype(np.int64) + steps
+    X = build_month_index_features(month_index, bundle['first_year'], bundle['feature_columns'])
+
+    if bundle['strategy'] == 'global':
+        preds = bundle['model'].predict(X) * bundle['levels'][rows] if len(X) else np.empty(0)
+    else:
+        preds = np.einsum('ij,ij->i', X, bundle['coef'][rows]) + bundle['intercept'][rows]
+
+    shape = (len(positions), months_ahead)
+    found_ids = [str(sid) for sid in bundle['series_ids'][positions]]
+    return found_ids, missing, month_index.reshape(shape), preds.reshape(shape)
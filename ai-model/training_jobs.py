@@ -0,0 +1,131 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import os
+import threading
+import uuid
+
+from atomic_files import write_json_atomic
+
+class TrainingJobs:
+    """Run model training jobs one at a time on a background worker
+
+    With jobs_dir, every job record is also written there as <job_id>.json so
+    any API worker process can report jobs another worker accepted.
+    """
+    def __init__(self, train_fn, on_complete=None, max_history=50, jobs_dir=None):
+        self.train_fn = train_fn
+        self.on_complete = on_complete
+        self.max_history = max_history
+        self.jobs_dir = jobs_dir
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='retrain')
+
+    def submit(self, kind='retrain', train_fn=None, coalesce=True, **train_kwargs):
+        """Queue a training job and return its status without waiting
+
+        train_fn defaults to the worker's train_fn. With coalesce, a job of the
+        same kind that is already queued or running is returned instead of
+        training twice on the same data.
+        """
+        with self._lock:
+            if coalesce:
+                for job in self._jobs.values():
+                    if job['kind'] == kind and job['status'] in ('queued', 'running'):
+                        return dict(job)
+
+            job_id = uuid.uuid4().hex
+            job = {
+                'job_id': job_id,
+                'kind': kind,
+                'status': 'queued',
+                'submitted_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                'model_type': None,
+                'version': None,
+                'mae': None,
+                'error': None
+            }
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.max_history:
+                self._jobs.popitem(last=False)
+            self._save(job)
+            self._prune_saved()
+
+        self._executor.submit(self._run, job_id, train_fn or self.train_fn, train_kwargs)
+        return dict(job)
+
+    def get(self, job_id):
+        """Get a copy of a job's status, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job)
+        return self._load(job_id)
+
+    def _job_file(self, job_id):
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        if self.jobs_dir:
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            write_json_atomic(job, self._job_file(job['job_id']))
+
+    def _load(self, job_id):
+        """Read a job record written by any worker, or None if unknown"""
+        try:
+            # Only well-formed ids map to file names
+            if not self.jobs_dir or uuid.UUID(hex=job_id).hex != job_id:
+                return None
+            with open(self._job_file(job_id)) as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return None
+
+    def _prune_saved(self):
+        """Delete the oldest saved job records beyond max_history"""
+        if not self.jobs_dir:
+            return
+        files = [os.path.join(self.jobs_dir, name) for name in os.listdir(self.jobs_dir) if name.endswith('.json')]
+        files.sort(key=os.path.getmtime)
+        for filename in files[:-self.max_history]:
+            try:
+                os.remove(filename)
+            except OSError:
+                # Another worker pruned it first
+                pass
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+                self._save(self._jobs[job_id])
+
+    def _run(self, job_id, train_fn, train_kwargs):
+        """Train the model and hand it to on_complete"""
+        self._update(job_id, status='running', started_at=datetime.now().isoformat())
+        try:
+            # None means there was nothing to train on, e.g. a sync without new data
+            model_data = train_fn(**train_kwargs) or {}
+            if self.on_complete and model_data:
+                self.on_complete(model_data)
+        except Exception as e:
+            print(f"❌ Training job {job_id} failed: {e}")
+            self._update(job_id, status='failed', error=str(e), finished_at=datetime.now().isoformat())
+            return
+
+        self._update(
+            job_id,
+            status='completed',
+            model_type=model_data.get('model_type'),
+            version=model_data.get('version'),
+            mae=model_data.get('mae'),
+            finished_at=datetime.now().isoformat()
+        )
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs and optionally wait for the current one"""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,16 @@
+"""Production entry point for the forecast API
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The model is loaded once in the gunicorn master (preload_app) before workers are
+forked, and its arrays are memory-mapped from sales_model.npz (or sales_model.pkl
+without a compact model), so extra workers share the model pages instead of each
+holding a private copy, also after a worker reloads a promoted model.
+"""
+import os
+
+os.environ.setdefault('FORECAST_MMAP_MODEL', '1')
+
+from forecast_api import app, forecast_api  # noqa: E402
+
+application = app